@@ -1,6 +1,17 @@
 import dataclasses
+from contextlib import AbstractAsyncContextManager
 from datetime import datetime
-from typing import Protocol, Any, Tuple, List, Optional, Literal, final
+from typing import (
+    Protocol,
+    Any,
+    Tuple,
+    List,
+    Optional,
+    Literal,
+    final,
+    AsyncGenerator,
+    BinaryIO,
+)
 
 from config.envs import DEFAULT_BUCKET_NAME
 from domain.assistant import (
@@ -8,8 +19,16 @@ from domain.assistant import (
     AssistantId,
     ThreadId,
     Message,
+    PooledAssistant,
+    VectorStore,
+    VectorStoreId,
+)
+from domain.document import (
+    DocumentId,
+    Document,
+    DocumentSummary,
+    DocumentSummaryCheckpoint,
 )
-from domain.document import DocumentId, Document, DocumentSummary
 from domain.user import User, UserId
 
 
@@ -21,6 +40,13 @@ class StorageAdapter(Protocol):
         bucket_name: str = DEFAULT_BUCKET_NAME,
     ) -> None: ...
 
+    async def upload_object(
+        self,
+        key: str,
+        source_file_name: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+    ) -> None: ...
+
     async def gen_pre_signed_upload_url(
         self,
         key: str,
@@ -40,6 +66,23 @@ class StorageAdapter(Protocol):
         self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
     ) -> None: ...
 
+    async def get_generation(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> int: ...
+
+    async def open_object(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> BinaryIO: ...
+
+
+class DownloadAdapter(Protocol):
+    def download(
+        self,
+        key: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+        use_cache: bool = True,
+    ) -> AbstractAsyncContextManager[BinaryIO]: ...
+
 
 class TaskQueueAdapter(Protocol):
     async def send_queue(
@@ -47,12 +90,38 @@ class TaskQueueAdapter(Protocol):
     ) -> None: ...
 
 
+class PdfAdapter(Protocol):
+    def extract_pages(self, document: BinaryIO) -> AsyncGenerator[str, None]: ...
+
+
 class LogAdapter(Protocol):
     def log_info(self, message: str) -> None: ...
 
     def log_error(self, e: Exception) -> None: ...
 
 
+class MetricsAdapter(Protocol):
+    def incr(
+        self, name: str, value: float = 1, labels: Optional[dict[str, str]] = None
+    ) -> None: ...
+
+    def observe(
+        self, name: str, value: float, labels: Optional[dict[str, str]] = None
+    ) -> None: ...
+
+    def snapshot(self) -> dict[str, dict[str, float]]: ...
+
+
+class RateLimiterAdapter(Protocol):
+    async def acquire(self, requests: int, tokens: int) -> None: ...
+
+
+class CacheAdapter(Protocol):
+    async def get(self, key: str) -> Optional[str]: ...
+
+    async def put(self, key: str, value: str) -> None: ...
+
+
 @final
 @dataclasses.dataclass(frozen=True)
 class ChatMessage:
@@ -63,14 +132,47 @@ class ChatMessage:
 class OpenAIAdapter(Protocol):
     async def chat_assistant(self, _assistant: Assistant, message: str) -> str: ...
 
+    def stream_chat_assistant(
+        self, _assistant: Assistant, message: str
+    ) -> AsyncGenerator[str, None]: ...
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId: ...
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None: ...
+
     async def create_assistant(
-        self, document_id: DocumentId, document_path: str
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
     ) -> Tuple[AssistantId, ThreadId]: ...
 
+    async def create_pooled_assistant(self) -> Tuple[AssistantId, ThreadId]: ...
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None: ...
+
     async def delete_assistant(self, assistant_id: AssistantId) -> None: ...
 
     async def chat_completion(self, messages: List[ChatMessage]) -> str: ...
 
+    async def create_embeddings(self, texts: List[str]) -> List[List[float]]: ...
+
+
+class AssistantPoolAdapter(Protocol):
+    async def take(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> Tuple[AssistantId, ThreadId]: ...
+
+    async def refill(self) -> int: ...
+
+
+class VectorStoreAdapter(Protocol):
+    async def acquire(self, document: BinaryIO) -> VectorStoreId: ...
+
+    async def release(self, vector_store_id: VectorStoreId) -> None: ...
+
 
 @final
 @dataclasses.dataclass(frozen=True)
@@ -127,11 +229,31 @@ class DocumentSummaryRepository(Protocol):
         self, document_id: DocumentId
     ) -> List[DocumentSummary]: ...
 
+    async def find_top_by_document(
+        self, document_id: DocumentId
+    ) -> List[DocumentSummary]: ...
+
     async def insert(self, summary: DocumentSummary) -> None: ...
 
+    async def replace_for_document(
+        self, document_id: DocumentId, summaries: List[DocumentSummary]
+    ) -> None: ...
+
     async def delete_by_document(self, document_id: DocumentId) -> None: ...
 
 
+class DocumentSummaryCheckpointRepository(Protocol):
+    async def find_by_document(
+        self, document_id: DocumentId, source_hash: str
+    ) -> List[DocumentSummaryCheckpoint]: ...
+
+    async def insert(self, checkpoint: DocumentSummaryCheckpoint) -> None: ...
+
+    async def delete_by_document(
+        self, document_id: DocumentId, keep_source_hash: Optional[str] = None
+    ) -> None: ...
+
+
 class AssistantRepository(Protocol):
     async def find_past(self, date: datetime) -> List[Tuple[Assistant, Document]]: ...
 
@@ -152,6 +274,22 @@ class AssistantRepository(Protocol):
     ) -> None: ...
 
 
+class VectorStoreRepository(Protocol):
+    async def acquire(self, content_hash: str) -> Optional[VectorStoreId]: ...
+
+    async def insert(self, vector_store: VectorStore) -> bool: ...
+
+    async def release(self, _id: VectorStoreId) -> bool: ...
+
+
+class AssistantPoolRepository(Protocol):
+    async def count(self) -> int: ...
+
+    async def take(self) -> Optional[PooledAssistant]: ...
+
+    async def insert(self, pooled: PooledAssistant) -> None: ...
+
+
 class AssistantFSRepository(Protocol):
     async def put(self, assistant: Assistant) -> None: ...
 
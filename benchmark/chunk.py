@@ -0,0 +1,77 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import AsyncIterator, Final, Callable
+
+from domain.chunk import chunk_text, estimate_tokens
+from domain.text import normalise_text
+from infra.pdf_worker import iter_pages
+
+SAMPLE_PDF: Final[str] = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../sample_resource/sample.pdf"
+)
+REPEAT: Final = 5
+
+
+async def _iter(pages: list[str]) -> AsyncIterator[str]:
+    for page in pages:
+        yield page
+
+
+async def _token_chunks(pages: list[str], max_tokens: int, overlap: int) -> list[str]:
+    return [
+        c
+        async for c in chunk_text(normalise_text(_iter(pages)), max_tokens, overlap)
+    ]
+
+
+async def _fixed_chunks(pages: list[str], size: int) -> list[str]:
+    text: Final = "".join([t async for t in normalise_text(_iter(pages))])
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _bench(name: str, chars: int, run: Callable[[], list[str]]) -> None:
+    elapsed: list[float] = []
+    chunks: list[str] = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        chunks = run()
+        elapsed.append(time.perf_counter() - started_at)
+
+    best: Final = min(elapsed)
+    tokens: Final = [estimate_tokens(c) for c in chunks]
+    mean_tokens: Final = statistics.mean(tokens)
+    print(
+        f"{name:<28} chunks={len(chunks):>3} "
+        f"tokens(min/avg/max)={min(tokens)}/{mean_tokens:.0f}/{max(tokens)} "
+        f"best={best * 1000:.1f}ms throughput={chars / best / 1_000_000:.2f}M chars/s"
+    )
+
+
+def main() -> None:
+    path: Final = sys.argv[1] if len(sys.argv) > 1 else SAMPLE_PDF
+
+    started_at: Final = time.perf_counter()
+    with open(path, "rb") as fp:
+        pages: Final = list(iter_pages(fp))
+    extract_sec: Final = time.perf_counter() - started_at
+    chars: Final = sum(len(p) for p in pages)
+    print(f"extract: pages={len(pages)} chars={chars} time={extract_sec:.2f}s")
+
+    _bench(
+        "fixed 10000 chars",
+        chars,
+        lambda: asyncio.run(_fixed_chunks(pages, 10000)),
+    )
+    for max_tokens, overlap in [(2000, 0), (4000, 0), (8000, 0), (8000, 400)]:
+        _bench(
+            f"tokens={max_tokens} overlap={overlap}",
+            chars,
+            lambda: asyncio.run(_token_chunks(pages, max_tokens, overlap)),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Final
+
+import httpx
+from openai import AsyncOpenAI
+
+from domain.assistant import Assistant, AssistantId, ThreadId
+from domain.document import DocumentId
+from infra.logger import LoggerImpl
+from infra.metrics import InMemoryMetricsImpl
+from infra.openai import NativeAsyncOpenAIImpl
+
+REPEAT: Final = 20
+# OpenAIのAPIまでの1往復にかかる時間を模擬する
+LATENCY_SECONDS: Final = 0.05
+
+
+def _run(status: str) -> dict[str, object]:
+    return {
+        "id": "run",
+        "object": "thread.run",
+        "created_at": 0,
+        "assistant_id": "assistant",
+        "thread_id": "thread",
+        "status": status,
+        "instructions": "",
+        "model": "model",
+        "tools": [],
+        "parallel_tool_calls": True,
+    }
+
+
+def _message(_id: str, role: str, text: str) -> dict[str, object]:
+    return {
+        "id": _id,
+        "object": "thread.message",
+        "created_at": 0,
+        "thread_id": "thread",
+        "role": role,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "attachments": [],
+        "status": "completed",
+    }
+
+
+class _StubTransport(httpx.AsyncBaseTransport):
+    def __init__(self) -> None:
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(LATENCY_SECONDS)
+        path: Final = request.url.path
+        if path.endswith("/assistants/assistant"):
+            return httpx.Response(
+                200,
+                json={
+                    "id": "assistant",
+                    "object": "assistant",
+                    "created_at": 0,
+                    "model": "model",
+                    "tools": [],
+                },
+            )
+        if path.endswith("/threads/thread"):
+            return httpx.Response(
+                200, json={"id": "thread", "object": "thread", "created_at": 0}
+            )
+        if path.endswith("/messages") and request.method == "POST":
+            return httpx.Response(200, json=_message("question", "user", ""))
+        if path.endswith("/messages"):
+            return httpx.Response(
+                200,
+                json={
+                    "object": "list",
+                    "data": [_message("answer", "assistant", "answer")],
+                    "has_more": False,
+                },
+            )
+        if path.endswith("/runs"):
+            events: Final = [
+                ("thread.run.created", "queued"),
+                ("thread.run.completed", "completed"),
+            ]
+            body: Final = "".join(
+                f"event: {e}\ndata: {json.dumps(_run(s))}\n\n" for e, s in events
+            )
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=(body + "event: done\ndata: [DONE]\n\n").encode(),
+            )
+        return httpx.Response(404, json={"error": {"message": path}})
+
+
+async def _bench(
+    name: str, transport: _StubTransport, run: Callable[[], Awaitable[str]]
+) -> None:
+    transport.requests = 0
+    elapsed: list[float] = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        await run()
+        elapsed.append(time.perf_counter() - started_at)
+
+    print(
+        f"{name:<30} requests/call={transport.requests / REPEAT:.1f} "
+        f"mean={statistics.mean(elapsed) * 1000:.1f}ms "
+        f"p50={statistics.median(elapsed) * 1000:.1f}ms"
+    )
+
+
+async def main() -> None:
+    transport: Final = _StubTransport()
+    cli: Final = AsyncOpenAI(
+        api_key="benchmark", http_client=httpx.AsyncClient(transport=transport)
+    )
+    timeout: Final = httpx.Timeout(10)
+    metrics: Final = InMemoryMetricsImpl.new()
+    log: Final = LoggerImpl.new()
+    assistant: Final = Assistant.new(
+        AssistantId("assistant"),
+        DocumentId("document"),
+        ThreadId("thread"),
+        datetime.now(timezone.utc),
+    )
+
+    stored_ids: Final = NativeAsyncOpenAIImpl.new(cli, timeout, metrics, log, True, 0)
+    cached: Final = NativeAsyncOpenAIImpl.new(cli, timeout, metrics, log, True, 300)
+
+    # 変更前と同じく、毎回アシスタントとスレッドを順に取得してから送信する
+    async def retrieve_every_call() -> str:
+        await cli.beta.assistants.retrieve(assistant_id=assistant.id)
+        await cli.beta.threads.retrieve(thread_id=assistant.thread_id)
+        return await stored_ids.chat_assistant(assistant, "question")
+
+    await _bench("retrieve on every call", transport, retrieve_every_call)
+    await _bench(
+        "stored ids",
+        transport,
+        lambda: stored_ids.chat_assistant(assistant, "question"),
+    )
+    await _bench(
+        "validated handle cache (300s)",
+        transport,
+        lambda: cached.chat_assistant(assistant, "question"),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
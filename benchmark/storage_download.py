@@ -0,0 +1,133 @@
+import base64
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Final
+
+import google_crc32c
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.storage import Client
+
+from infra.cloud_storage import CloudStorageImpl
+
+REPEAT: Final = 3
+BUCKET: Final = "benchmark"
+KEY: Final = "benchmark.pdf"
+OBJECT_BYTES: Final = 128 * 1024 * 1024
+# Cloud Storageの1ストリームあたりの帯域と、1リクエストごとの最初の応答までの時間を模擬する
+STREAM_BYTES_PER_SECOND: Final = 64 * 1024 * 1024
+LATENCY_SECONDS: Final = 0.03
+WRITE_CHUNK_BYTES: Final = 256 * 1024
+# (スライスのサイズ, 並列数)
+SLICED: Final = [
+    (8 * 1024 * 1024, 4),
+    (8 * 1024 * 1024, 8),
+    (16 * 1024 * 1024, 8),
+    (32 * 1024 * 1024, 8),
+]
+
+_DATA: Final = os.urandom(OBJECT_BYTES)
+_CRC32C: Final = base64.b64encode(
+    google_crc32c.Checksum(_DATA).digest()  # type: ignore[no-untyped-call]
+).decode("ascii")
+
+
+# JSON APIのメタデータの取得と、Rangeヘッダー付きのメディアのダウンロードだけを実装する
+class _FakeGcsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        time.sleep(LATENCY_SECONDS)
+        if "alt=media" not in self.path:
+            body: Final = (
+                f'{{"name": "{KEY}", "bucket": "{BUCKET}", "size": "{OBJECT_BYTES}", '
+                f'"generation": "1", "crc32c": "{_CRC32C}"}}'
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        start, end = 0, OBJECT_BYTES - 1
+        match: Final = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{OBJECT_BYTES}")
+        else:
+            self.send_response(200)
+            self.send_header("x-goog-hash", f"crc32c={_CRC32C}")
+        self.send_header("x-goog-generation", "1")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        for offset in range(start, end + 1, WRITE_CHUNK_BYTES):
+            chunk = _DATA[offset : min(offset + WRITE_CHUNK_BYTES, end + 1)]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / STREAM_BYTES_PER_SECOND)
+
+
+def _bench(name: str, run: Callable[[], None]) -> None:
+    elapsed: list[float] = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        run()
+        elapsed.append(time.perf_counter() - started_at)
+
+    best: Final = min(elapsed)
+    print(
+        f"{name:<36} best={best * 1000:.0f}ms "
+        f"median={statistics.median(elapsed) * 1000:.0f}ms "
+        f"throughput={OBJECT_BYTES / best / 1024 / 1024:.0f}MiB/s"
+    )
+
+
+def main() -> None:
+    server: Final = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGcsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cli: Final = Client(
+        project=BUCKET,
+        credentials=AnonymousCredentials(),  # type: ignore[no-untyped-call]
+        client_options={"api_endpoint": f"http://127.0.0.1:{server.server_port}"},
+    )
+    print(
+        f"object={OBJECT_BYTES // 1024 // 1024}MiB "
+        f"stream={STREAM_BYTES_PER_SECOND // 1024 // 1024}MiB/s "
+        f"latency={LATENCY_SECONDS * 1000:.0f}ms"
+    )
+
+    cases: Final = [("single stream", 0, 1)] + [
+        (f"sliced {size // 1024 // 1024}MiB x{parallelism}", size, parallelism)
+        for size, parallelism in SLICED
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path: Final = os.path.join(directory, KEY)
+        for name, slice_bytes, parallelism in cases:
+            storage = CloudStorageImpl(
+                cli, OBJECT_BYTES, max(slice_bytes, 1), parallelism
+            )
+
+            def to_file() -> None:
+                storage.download_object(KEY, path, BUCKET)
+
+            def to_buffer() -> None:
+                storage.open_object(KEY, BUCKET).close()
+
+            _bench(f"{name} (file)", to_file)
+            _bench(f"{name} (buffer)", to_buffer)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
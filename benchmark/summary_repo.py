@@ -0,0 +1,81 @@
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Final
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config.envs import DATABASE_URL
+from domain.document import Document, DocumentSummary, SummaryRunId
+from domain.user import User, UserId
+from infra.cloud_sql.document_repo import DocumentRepoImpl
+from infra.cloud_sql.document_summary_repo import DocumentSummaryRepoImpl
+from infra.cloud_sql.user_repo import UserRepoImpl
+
+REPEAT: Final = 10
+SUMMARY_COUNTS: Final = [1, 10, 50, 200]
+# 要約1件あたりのおおよその長さ
+SUMMARY_TEXT: Final = "- 要約のテキスト\n" * 40
+
+
+async def _bench(name: str, count: int, run: Callable[[], Awaitable[None]]) -> None:
+    elapsed: list[float] = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        await run()
+        elapsed.append(time.perf_counter() - started_at)
+
+    print(
+        f"{name:<22} summaries={count:>3} "
+        f"best={min(elapsed) * 1000:.1f}ms "
+        f"median={statistics.median(elapsed) * 1000:.1f}ms"
+    )
+
+
+async def main() -> None:
+    engine: Final = create_async_engine(DATABASE_URL)
+    session: Final = async_sessionmaker(bind=engine)
+    user_repository: Final = UserRepoImpl.new(session)
+    document_repository: Final = DocumentRepoImpl.new(session)
+    document_summary_repository: Final = DocumentSummaryRepoImpl.new(session)
+    now: Final = datetime.now(timezone.utc)
+
+    user: Final = User.new(UserId(f"benchmark-{uuid.uuid4()}"), "benchmark", now)
+    await user_repository.insert(user)
+    document: Final = Document.new(
+        user.id, "benchmark", "benchmark", "gs://benchmark/benchmark.pdf", now
+    )
+    await document_repository.insert(document)
+
+    try:
+        for count in SUMMARY_COUNTS:
+            summaries = [
+                DocumentSummary.new(
+                    document.id, SUMMARY_TEXT, i, 0, SummaryRunId("benchmark"), now
+                )
+                for i in range(count)
+            ]
+
+            async def loop() -> None:
+                await document_summary_repository.delete_by_document(document.id)
+                for summary in summaries:
+                    await document_summary_repository.insert(summary)
+
+            async def replace() -> None:
+                await document_summary_repository.replace_for_document(
+                    document.id, summaries
+                )
+
+            await _bench("delete + insert loop", count, loop)
+            await _bench("replace_for_document", count, replace)
+    finally:
+        await document_summary_repository.delete_by_document(document.id)
+        await document_repository.delete(document.id)
+        await user_repository.delete(user.id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -29,9 +29,13 @@ CREATE TABLE IF NOT EXISTS document_summaries (
     document_id VARCHAR(255) NOT NULL,
     text TEXT NOT NULL,
     index INTEGER NOT NULL,
+    level INTEGER NOT NULL DEFAULT 0,
+    run_id VARCHAR(255) NOT NULL DEFAULT '',
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
+ALTER TABLE document_summaries ADD COLUMN IF NOT EXISTS level INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE document_summaries ADD COLUMN IF NOT EXISTS run_id VARCHAR(255) NOT NULL DEFAULT '';
 ALTER TABLE document_summaries
     ADD CONSTRAINT fk_document_summaries_documents
     FOREIGN KEY (document_id)
@@ -40,17 +44,62 @@ ALTER TABLE document_summaries
     ON UPDATE NO ACTION;
 CREATE INDEX IF NOT EXISTS idx_document_id ON document_summaries (document_id);
 
+CREATE TABLE IF NOT EXISTS document_summary_checkpoints (
+    document_id VARCHAR(255) NOT NULL,
+    source_hash VARCHAR(64) NOT NULL,
+    index INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (document_id, source_hash, index)
+);
+ALTER TABLE document_summary_checkpoints
+    ADD CONSTRAINT fk_document_summary_checkpoints_documents
+    FOREIGN KEY (document_id)
+    REFERENCES documents (id)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION;
+
 CREATE TABLE IF NOT EXISTS assistants (
     document_id VARCHAR(255) PRIMARY KEY,
     assistant_id VARCHAR(255) NOT NULL,
     thread_id VARCHAR(255) NOT NULL,
+    vector_store_id VARCHAR(255),
     used_at TIMESTAMP WITH TIME ZONE NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
+ALTER TABLE assistants ADD COLUMN IF NOT EXISTS vector_store_id VARCHAR(255);
 ALTER TABLE assistants
     ADD CONSTRAINT fk_assistants_documents
     FOREIGN KEY (document_id)
     REFERENCES documents (id)
     ON DELETE NO ACTION
-    ON UPDATE NO ACTION;
\ No newline at end of file
+    ON UPDATE NO ACTION;
+
+CREATE TABLE IF NOT EXISTS summary_caches (
+    key VARCHAR(64) PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_used_at ON summary_caches (used_at DESC);
+
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name VARCHAR(64) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS vector_stores (
+    id VARCHAR(255) PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL UNIQUE,
+    ref_count INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS assistant_pool (
+    assistant_id VARCHAR(255) PRIMARY KEY,
+    thread_id VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
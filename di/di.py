@@ -1,9 +1,10 @@
 from dependency_injector import containers, providers
-from dependency_injector.providers import Singleton
+from dependency_injector.providers import Singleton, Selector
 from google.cloud import storage
 from google.cloud import tasks_v2
 from google.cloud.firestore import AsyncClient
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from adapter.adapter import (
@@ -17,19 +18,107 @@ from adapter.adapter import (
     AssistantFSRepository,
     MessageFSRepository,
     DocumentSummaryRepository,
+    PdfAdapter,
+    MetricsAdapter,
+    CacheAdapter,
+    DocumentSummaryCheckpointRepository,
+    RateLimiterAdapter,
+    VectorStoreAdapter,
+    AssistantPoolAdapter,
+    DownloadAdapter,
 )
 from config.envs import DATABASE_URL
 from config.envs import OPENAI_API_KEY
+from config.envs import (
+    OPENAI_CLIENT,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+    OPENAI_HTTP2,
+    OPENAI_CONNECT_TIMEOUT_SECONDS,
+    OPENAI_TIMEOUT_SECONDS,
+    OPENAI_REQUEST_TIMEOUT_SECONDS,
+    OPENAI_STREAM_RUNS,
+    OPENAI_HANDLE_CACHE_TTL_SECONDS,
+    OPENAI_RATE_LIMIT_BACKEND,
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_ASSISTANT_TOKENS,
+)
+from config.envs import ASSISTANT_POOL_SIZE
+from config.envs import (
+    ASSISTANT_BACKEND,
+    LOCAL_RETRIEVAL_DIR,
+    LOCAL_RETRIEVAL_CHUNK_TOKENS,
+    LOCAL_RETRIEVAL_CHUNK_OVERLAP_TOKENS,
+    LOCAL_RETRIEVAL_TOP_K,
+    LOCAL_RETRIEVAL_INDEX_CACHE_SIZE,
+)
+from config.envs import (
+    RESILIENCE_MAX_ATTEMPTS,
+    RESILIENCE_BASE_DELAY_SECONDS,
+    RESILIENCE_MAX_DELAY_SECONDS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+)
+from config.envs import ANSWER_CACHE_MEMORY_BYTES, ANSWER_CACHE_TTL_SECONDS
+from config.envs import (
+    PRE_SIGNED_URL_CACHE_MEMORY_BYTES,
+    PRE_SIGNED_URL_CACHE_TTL_SECONDS,
+)
+from config.envs import (
+    DOWNLOAD_DIR,
+    DOWNLOAD_CACHE_BYTES,
+    STORAGE_IN_MEMORY_MAX_BYTES,
+    STORAGE_SLICE_BYTES,
+    STORAGE_DOWNLOAD_PARALLELISM,
+)
+from config.envs import (
+    SUMMARY_CACHE_BACKEND,
+    SUMMARY_CACHE_MEMORY_BYTES,
+    SUMMARY_CACHE_CLOUD_SQL_BYTES,
+)
+from config.envs import (
+    PDF_EXTRACT_WORKERS,
+    PDF_EXTRACT_TIMEOUT_SECONDS,
+    PDF_EXTRACT_MEMORY_LIMIT_MB,
+)
+from infra.cloud_sql.assistant_pool_repo import AssistantPoolRepoImpl
 from infra.cloud_sql.assistant_repo import AssistantRepoImpl
 from infra.cloud_sql.document_repo import DocumentRepoImpl
+from infra.cloud_sql.document_summary_checkpoint_repo import (
+    DocumentSummaryCheckpointRepoImpl,
+)
 from infra.cloud_sql.document_summary_repo import DocumentSummaryRepoImpl
+from infra.cloud_sql.rate_limit_repo import RateLimiterRepoImpl
+from infra.cloud_sql.summary_cache_repo import SummaryCacheRepoImpl
 from infra.cloud_sql.user_repo import UserRepoImpl
-from infra.cloud_storage import CloudStorageImpl, AsyncCloudStorageImpl
+from infra.cloud_sql.vector_store_repo import VectorStoreRepoImpl
+from infra.assistant_pool import AssistantPoolImpl
+from infra.cache import LruCacheImpl, TieredCacheImpl
+from infra.cloud_storage import (
+    CloudStorageImpl,
+    AsyncCloudStorageImpl,
+    CloudStorageDownloadImpl,
+)
 from infra.cloud_tasks import CloudTasksImpl, AsyncCloudTasksImpl
 from infra.firestore.assistant_repo import AssistantFSRepoImpl
 from infra.firestore.message_repo import MessageFSRepoImpl
+from infra.local_retrieval import LocalRetrievalOpenAIImpl
 from infra.logger import LoggerImpl
-from infra.openai import OpenAIImpl, AsyncOpenAIImpl
+from infra.metrics import InMemoryMetricsImpl
+from infra.openai import OpenAIImpl, AsyncOpenAIImpl, NativeAsyncOpenAIImpl
+from infra.pdf import PdfMinerImpl
+from infra.rate_limit import InMemoryRateLimiterImpl, RateLimitedOpenAIImpl
+from infra.vector_store import SharedVectorStoreImpl
+from infra.resilience import (
+    Resilience,
+    ResilientOpenAIImpl,
+    ResilientStorageImpl,
+    ResilientTaskQueueImpl,
+    is_transient_google_error,
+    is_transient_openai_error,
+)
 
 
 class AppContainer(containers.DeclarativeContainer):
@@ -43,32 +132,230 @@ class AppContainer(containers.DeclarativeContainer):
     __cloud_tasks_client: Singleton[tasks_v2.CloudTasksClient] = providers.Singleton(
         tasks_v2.CloudTasksClient
     )
+    # リトライはResilientOpenAIImplで行うため、SDK側のリトライは無効にする
     __openai_client: Singleton[OpenAI] = providers.Singleton(
-        OpenAI, api_key=__openai_api_key
+        OpenAI, api_key=__openai_api_key, max_retries=0
+    )
+    __async_openai_client: Singleton[AsyncOpenAI] = providers.Singleton(
+        AsyncOpenAI,
+        api_key=__openai_api_key,
+        max_retries=0,
+        http_client=providers.Singleton(
+            DefaultAsyncHttpxClient,
+            limits=providers.Singleton(
+                httpx.Limits,
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=providers.Singleton(
+                httpx.Timeout,
+                OPENAI_TIMEOUT_SECONDS,
+                connect=OPENAI_CONNECT_TIMEOUT_SECONDS,
+            ),
+            http2=OPENAI_HTTP2,
+        ),
     )
     __firestore: Singleton[AsyncClient] = providers.Singleton(
         AsyncClient, database="pdf-assistant"
     )
     __cloud_storage_impl: Singleton[CloudStorageImpl] = providers.Singleton(
-        CloudStorageImpl, cli=__cloud_storage_client
+        CloudStorageImpl,
+        cli=__cloud_storage_client,
+        in_memory_max_bytes=STORAGE_IN_MEMORY_MAX_BYTES,
+        slice_bytes=STORAGE_SLICE_BYTES,
+        parallelism=STORAGE_DOWNLOAD_PARALLELISM,
     )
     __cloud_tasks_impl: Singleton[CloudTasksImpl] = providers.Singleton(
         CloudTasksImpl, cli=__cloud_tasks_client
     )
-    __openai_impl: Singleton[OpenAIImpl] = providers.Singleton(
-        OpenAIImpl, cli=__openai_client
-    )
 
     # Adapters
     log_adapter: Singleton[LogAdapter] = providers.Singleton(LoggerImpl.new)
+    metrics_adapter: Singleton[MetricsAdapter] = providers.Singleton(
+        InMemoryMetricsImpl.new
+    )
     storage_adapter: Singleton[StorageAdapter] = providers.Singleton(
-        AsyncCloudStorageImpl.new, inner=__cloud_storage_impl
+        ResilientStorageImpl.new,
+        inner=providers.Singleton(
+            AsyncCloudStorageImpl.new, inner=__cloud_storage_impl
+        ),
+        resilience=providers.Singleton(
+            Resilience,
+            name="cloud_storage",
+            is_transient=is_transient_google_error,
+            max_attempts=RESILIENCE_MAX_ATTEMPTS,
+            base_delay_seconds=RESILIENCE_BASE_DELAY_SECONDS,
+            max_delay_seconds=RESILIENCE_MAX_DELAY_SECONDS,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=CIRCUIT_RESET_SECONDS,
+            metrics=metrics_adapter,
+        ),
+    )
+    download_adapter: Singleton[DownloadAdapter] = providers.Singleton(
+        CloudStorageDownloadImpl.new,
+        storage=storage_adapter,
+        work_dir=DOWNLOAD_DIR,
+        cache_bytes=DOWNLOAD_CACHE_BYTES,
+        metrics=metrics_adapter,
     )
     task_queue_adapter: Singleton[TaskQueueAdapter] = providers.Singleton(
-        AsyncCloudTasksImpl.new, inner=__cloud_tasks_impl
+        ResilientTaskQueueImpl.new,
+        inner=providers.Singleton(AsyncCloudTasksImpl.new, inner=__cloud_tasks_impl),
+        resilience=providers.Singleton(
+            Resilience,
+            name="cloud_tasks",
+            is_transient=is_transient_google_error,
+            max_attempts=RESILIENCE_MAX_ATTEMPTS,
+            base_delay_seconds=RESILIENCE_BASE_DELAY_SECONDS,
+            max_delay_seconds=RESILIENCE_MAX_DELAY_SECONDS,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=CIRCUIT_RESET_SECONDS,
+            metrics=metrics_adapter,
+        ),
+    )
+    pdf_adapter: Singleton[PdfAdapter] = providers.Singleton(
+        PdfMinerImpl.new,
+        max_workers=PDF_EXTRACT_WORKERS,
+        timeout_seconds=PDF_EXTRACT_TIMEOUT_SECONDS,
+        memory_limit_mb=PDF_EXTRACT_MEMORY_LIMIT_MB,
     )
-    openai_adapter: Singleton[OpenAIAdapter] = providers.Singleton(
-        AsyncOpenAIImpl.new, inner=__openai_impl
+    __openai_impl: Singleton[OpenAIImpl] = providers.Singleton(
+        OpenAIImpl,
+        cli=__openai_client,
+        metrics=metrics_adapter,
+        log=log_adapter,
+        stream_runs=OPENAI_STREAM_RUNS,
+        handle_cache_ttl_seconds=OPENAI_HANDLE_CACHE_TTL_SECONDS,
+    )
+    __openai_client_adapter: Selector[OpenAIAdapter] = providers.Selector(
+        providers.Object(OPENAI_CLIENT),
+        thread=providers.Singleton(AsyncOpenAIImpl.new, inner=__openai_impl),
+        native=providers.Singleton(
+            NativeAsyncOpenAIImpl.new,
+            cli=__async_openai_client,
+            request_timeout=providers.Singleton(
+                httpx.Timeout,
+                OPENAI_REQUEST_TIMEOUT_SECONDS,
+                connect=OPENAI_CONNECT_TIMEOUT_SECONDS,
+            ),
+            metrics=metrics_adapter,
+            log=log_adapter,
+            stream_runs=OPENAI_STREAM_RUNS,
+            handle_cache_ttl_seconds=OPENAI_HANDLE_CACHE_TTL_SECONDS,
+        ),
+    )
+    __openai_rate_limiter: Selector[RateLimiterAdapter] = providers.Selector(
+        providers.Object(OPENAI_RATE_LIMIT_BACKEND),
+        memory=providers.Singleton(
+            InMemoryRateLimiterImpl.new,
+            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+            metrics=metrics_adapter,
+        ),
+        cloud_sql=providers.Singleton(
+            RateLimiterRepoImpl.new,
+            __session,
+            name="openai",
+            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+            metrics=metrics_adapter,
+        ),
+    )
+    __rate_limited_openai: Singleton[OpenAIAdapter] = providers.Singleton(
+        RateLimitedOpenAIImpl.new,
+        inner=__openai_client_adapter,
+        limiter=__openai_rate_limiter,
+        assistant_tokens=OPENAI_ASSISTANT_TOKENS,
+    )
+    # リトライのたびにレート制限の予算を確保し直すよう、最も外側で包む
+    __remote_openai: Singleton[OpenAIAdapter] = providers.Singleton(
+        ResilientOpenAIImpl.new,
+        inner=providers.Selector(
+            providers.Object(OPENAI_RATE_LIMIT_BACKEND),
+            none=__openai_client_adapter,
+            memory=__rate_limited_openai,
+            cloud_sql=__rate_limited_openai,
+        ),
+        resilience=providers.Singleton(
+            Resilience,
+            name="openai",
+            is_transient=is_transient_openai_error,
+            max_attempts=RESILIENCE_MAX_ATTEMPTS,
+            base_delay_seconds=RESILIENCE_BASE_DELAY_SECONDS,
+            max_delay_seconds=RESILIENCE_MAX_DELAY_SECONDS,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=CIRCUIT_RESET_SECONDS,
+            metrics=metrics_adapter,
+        ),
+    )
+    openai_adapter: Selector[OpenAIAdapter] = providers.Selector(
+        providers.Object(ASSISTANT_BACKEND),
+        assistants=__remote_openai,
+        local=providers.Singleton(
+            LocalRetrievalOpenAIImpl.new,
+            inner=__remote_openai,
+            pdf=pdf_adapter,
+            storage=storage_adapter,
+            metrics=metrics_adapter,
+            index_dir=LOCAL_RETRIEVAL_DIR,
+            chunk_tokens=LOCAL_RETRIEVAL_CHUNK_TOKENS,
+            chunk_overlap_tokens=LOCAL_RETRIEVAL_CHUNK_OVERLAP_TOKENS,
+            top_k=LOCAL_RETRIEVAL_TOP_K,
+            index_cache_size=LOCAL_RETRIEVAL_INDEX_CACHE_SIZE,
+        ),
+    )
+    vector_store_adapter: Singleton[VectorStoreAdapter] = providers.Singleton(
+        SharedVectorStoreImpl.new,
+        openai=openai_adapter,
+        repository=providers.Singleton(VectorStoreRepoImpl.new, __session),
+        metrics=metrics_adapter,
+    )
+    assistant_pool_adapter: Singleton[AssistantPoolAdapter] = providers.Singleton(
+        AssistantPoolImpl.new,
+        openai=openai_adapter,
+        repository=providers.Singleton(AssistantPoolRepoImpl.new, __session),
+        size=ASSISTANT_POOL_SIZE,
+        metrics=metrics_adapter,
+    )
+    __summary_memory_cache: Singleton[CacheAdapter] = providers.Singleton(
+        LruCacheImpl.new,
+        name="summary_memory",
+        max_bytes=SUMMARY_CACHE_MEMORY_BYTES,
+        metrics=metrics_adapter,
+    )
+    __summary_cloud_sql_cache: Singleton[CacheAdapter] = providers.Singleton(
+        SummaryCacheRepoImpl.new,
+        __session,
+        max_bytes=SUMMARY_CACHE_CLOUD_SQL_BYTES,
+        metrics=metrics_adapter,
+        log=log_adapter,
+    )
+    summary_cache_adapter: Selector[CacheAdapter] = providers.Selector(
+        providers.Object(SUMMARY_CACHE_BACKEND),
+        memory=__summary_memory_cache,
+        cloud_sql=__summary_cloud_sql_cache,
+        tiered=providers.Singleton(
+            TieredCacheImpl.new,
+            first=__summary_memory_cache,
+            second=__summary_cloud_sql_cache,
+        ),
+    )
+
+    answer_cache_adapter: Singleton[CacheAdapter] = providers.Singleton(
+        LruCacheImpl.new,
+        name="answer_memory",
+        max_bytes=ANSWER_CACHE_MEMORY_BYTES,
+        metrics=metrics_adapter,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    )
+
+    pre_signed_url_cache_adapter: Singleton[CacheAdapter] = providers.Singleton(
+        LruCacheImpl.new,
+        name="pre_signed_url",
+        max_bytes=PRE_SIGNED_URL_CACHE_MEMORY_BYTES,
+        metrics=metrics_adapter,
+        ttl_seconds=PRE_SIGNED_URL_CACHE_TTL_SECONDS,
     )
 
     # Repositories
@@ -81,6 +368,9 @@ class AppContainer(containers.DeclarativeContainer):
     document_summary_repository: Singleton[DocumentSummaryRepository] = (
         providers.Singleton(DocumentSummaryRepoImpl.new, __session)
     )
+    document_summary_checkpoint_repository: Singleton[
+        DocumentSummaryCheckpointRepository
+    ] = providers.Singleton(DocumentSummaryCheckpointRepoImpl.new, __session)
     assistant_repository: Singleton[AssistantRepository] = providers.Singleton(
         AssistantRepoImpl.new, __session
     )
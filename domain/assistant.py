@@ -3,13 +3,14 @@ from __future__ import annotations
 import dataclasses
 import uuid
 from datetime import datetime
-from typing import final, NewType, Literal, Self
+from typing import final, NewType, Literal, Optional, Self
 
 from domain.document import DocumentId
 
 AssistantId = NewType("AssistantId", str)
 ThreadId = NewType("ThreadId", str)
 MessageId = NewType("MessageId", str)
+VectorStoreId = NewType("VectorStoreId", str)
 
 
 @final
@@ -21,6 +22,7 @@ class Assistant:
     used_at: datetime
     created_at: datetime
     updated_at: datetime
+    vector_store_id: Optional[VectorStoreId] = None
 
     @classmethod
     def new(
@@ -29,6 +31,7 @@ class Assistant:
             document_id: DocumentId,
             thread_id: ThreadId,
             now: datetime,
+            vector_store_id: Optional[VectorStoreId] = None,
     ) -> Self:
         return cls(
             id=_id,
@@ -37,6 +40,7 @@ class Assistant:
             used_at=now,
             created_at=now,
             updated_at=now,
+            vector_store_id=vector_store_id,
         )
 
     def use(self, now: datetime) -> None:
@@ -70,4 +74,52 @@ class Message:
         )
 
 
+# 同じ内容のPDFから作ったベクトルストアは複数のアシスタントで共有する
+@final
+@dataclasses.dataclass
+class VectorStore:
+    id: VectorStoreId
+    content_hash: str
+    ref_count: int
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def new(
+            cls,
+            _id: VectorStoreId,
+            content_hash: str,
+            now: datetime,
+    ) -> Self:
+        return cls(
+            id=_id,
+            content_hash=content_hash,
+            ref_count=1,
+            created_at=now,
+            updated_at=now,
+        )
+
+
+# ドキュメントに割り当てる前のアシスタントとスレッドの組
+@final
+@dataclasses.dataclass
+class PooledAssistant:
+    id: AssistantId
+    thread_id: ThreadId
+    created_at: datetime
+
+    @classmethod
+    def new(
+            cls,
+            _id: AssistantId,
+            thread_id: ThreadId,
+            now: datetime,
+    ) -> Self:
+        return cls(
+            id=_id,
+            thread_id=thread_id,
+            created_at=now,
+        )
+
+
 type MessageRole = Literal["user", "assistant"]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import math
+import re
+from typing import AsyncIterable, AsyncIterator, Callable, Final, final, Optional
+
+# ひらがな・カタカナ・CJK統合漢字・全角記号はおおよそ1文字1トークンになる
+_CJK: Final = re.compile(
+    r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]"
+)
+_PARAGRAPH_END: Final = re.compile(r"\n\n")
+_SENTENCE_END: Final = re.compile(r"[。！？!?]|[.．](?=\s|$)")
+_WORD_END: Final = re.compile(r"\s")
+
+type TokenCounter = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    cjk: Final = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+@final
+class TokenChunker:
+    def __init__(
+        self,
+        max_tokens: int,
+        overlap_tokens: int = 0,
+        count_tokens: TokenCounter = estimate_tokens,
+    ) -> None:
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap_tokens < max_tokens // 2:
+            raise ValueError("overlap_tokens must be less than half of max_tokens")
+        self.max_tokens: Final = max_tokens
+        self.overlap_tokens: Final = overlap_tokens
+        self.count_tokens: Final = count_tokens
+        self.__buf: str = ""
+
+    def feed(self, text: str) -> list[str]:
+        self.__buf += text
+        chunks: Final[list[str]] = []
+        while self.count_tokens(self.__buf) > self.max_tokens:
+            chunks.append(self.__cut())
+        return [c for c in chunks if c]
+
+    def flush(self) -> list[str]:
+        chunks: Final = self.feed("")
+        rest: Final = self.__buf.strip()
+        self.__buf = ""
+        if rest:
+            chunks.append(rest)
+        return chunks
+
+    def __cut(self) -> str:
+        buf: Final = self.__buf
+        limit: Final = self.__fit(buf)
+        end: Final = self.__boundary(buf, limit)
+        chunk: Final = buf[:end].strip()
+
+        start = end
+        if self.overlap_tokens > 0:
+            start = self.__overlap_start(buf, end)
+        self.__buf = buf[start:]
+        return chunk
+
+    # buf[:end]がmax_tokens以内に収まる最大のendを二分探索で求める
+    def __fit(self, buf: str) -> int:
+        lo, hi = 0, len(buf)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.count_tokens(buf[:mid]) <= self.max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        return max(lo, 1)
+
+    # 段落 → 文 → 単語の順に区切りを探し、チャンクが小さくなりすぎる場合は次の候補を使う
+    @staticmethod
+    def __boundary(buf: str, limit: int) -> int:
+        for pattern, min_ratio in (
+            (_PARAGRAPH_END, 0.6),
+            (_SENTENCE_END, 0.3),
+            (_WORD_END, 0.3),
+        ):
+            end = _last_match_end(pattern, buf, limit)
+            if end is not None and end > limit * min_ratio:
+                return end
+        return limit
+
+    # buf[start:end]がoverlap_tokens以内に収まる最小のstartを二分探索で求める
+    def __overlap_start(self, buf: str, end: int) -> int:
+        lo, hi = 0, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.count_tokens(buf[mid:end]) <= self.overlap_tokens:
+                hi = mid
+            else:
+                lo = mid + 1
+        # 重複部分は文の途中から始めない
+        start = lo
+        if _SENTENCE_END.search(buf[:lo].rstrip()[-1:] + " ") is None:
+            sentence: Final = _SENTENCE_END.search(buf, lo, end)
+            if sentence is not None:
+                start = sentence.end()
+        # 先頭まで重複すると処理が進まないため、その場合は重複させない
+        return start if 0 < start < end else end
+
+
+def _last_match_end(pattern: re.Pattern[str], text: str, limit: int) -> Optional[int]:
+    end = None
+    for match in pattern.finditer(text, 0, limit):
+        end = match.end()
+    return end
+
+
+async def chunk_text(
+    texts: AsyncIterable[str],
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    count_tokens: TokenCounter = estimate_tokens,
+) -> AsyncIterator[str]:
+    chunker: Final = TokenChunker(max_tokens, overlap_tokens, count_tokens)
+    async for text in texts:
+        for chunk in chunker.feed(text):
+            yield chunk
+    for chunk in chunker.flush():
+        yield chunk
+
+
+# 要約を統合する際、連続するテキストをmax_tokens以内にまとめる
+# 1段ごとに必ず件数が減るよう、末尾以外のグループは最低2件にする
+def group_texts(
+    texts: list[str],
+    max_tokens: int,
+    count_tokens: TokenCounter = estimate_tokens,
+) -> list[list[str]]:
+    groups: Final[list[list[str]]] = []
+    group: list[str] = []
+    tokens = 0
+    for text in texts:
+        n = count_tokens(text)
+        if len(group) >= 2 and tokens + n > max_tokens:
+            groups.append(group)
+            group, tokens = [], 0
+        group.append(text)
+        tokens += n
+    if group:
+        groups.append(group)
+    return groups
@@ -10,6 +10,8 @@ from domain.user import UserId
 
 DocumentId = NewType("DocumentId", str)
 DocumentSummaryId = NewType("DocumentSummaryId", str)
+# 要約のリクエストごとに振り、ストリームが以前の要約を完了済みと取り違えないようにする
+SummaryRunId = NewType("SummaryRunId", str)
 
 
 @final
@@ -54,6 +56,10 @@ class Document:
         self.updated_at = now
 
 
+def new_summary_run_id() -> SummaryRunId:
+    return SummaryRunId(str(uuid.uuid4()))
+
+
 @final
 class Status(Enum):
     PREPARE_ASSISTANT = 1
@@ -67,18 +73,56 @@ class DocumentSummary:
     document_id: DocumentId
     text: str
     index: int
+    # 0はチャンクごとの要約、1以上は下の階層を統合した要約で、最上位がドキュメント全体の要約
+    level: int
+    run_id: SummaryRunId
     created_at: datetime
     updated_at: datetime
 
     @classmethod
     def new(
-            cls, document_id: DocumentId, text: str, index: int, now: datetime
+            cls,
+            document_id: DocumentId,
+            text: str,
+            index: int,
+            level: int,
+            run_id: SummaryRunId,
+            now: datetime,
     ) -> Self:
         return cls(
             id=DocumentSummaryId(str(uuid.uuid4())),
             document_id=document_id,
             text=text,
             index=index,
+            level=level,
+            run_id=run_id,
             created_at=now,
             updated_at=now,
         )
+
+
+@final
+@dataclasses.dataclass
+class DocumentSummaryCheckpoint:
+    document_id: DocumentId
+    source_hash: str
+    index: int
+    text: str
+    created_at: datetime
+
+    @classmethod
+    def new(
+            cls,
+            document_id: DocumentId,
+            source_hash: str,
+            index: int,
+            text: str,
+            now: datetime,
+    ) -> Self:
+        return cls(
+            document_id=document_id,
+            source_hash=source_hash,
+            index=index,
+            text=text,
+            created_at=now,
+        )
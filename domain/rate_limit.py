@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Final, final
+
+
+# 予約型のトークンバケット
+# 残量が足りなくても先に差し引いて残量をマイナスにし、不足分が補充されるまでの待ち時間を返す
+# 呼び出し順に待ち時間が積み上がるため、先に来た呼び出しから順に実行される
+@final
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float, now: float) -> None:
+        if capacity <= 0 or per_second <= 0:
+            raise ValueError("capacity and per_second must be positive")
+        self.capacity: Final = capacity
+        self.per_second: Final = per_second
+        self.__tokens: float = capacity
+        self.__updated_at: float = now
+
+    @classmethod
+    def per_minute(cls, limit: float, now: float) -> TokenBucket:
+        return cls(limit, limit / 60, now)
+
+    def reserve(self, amount: float, now: float) -> float:
+        elapsed: Final = max(0.0, now - self.__updated_at)
+        self.__tokens = (
+            min(self.capacity, self.__tokens + elapsed * self.per_second) - amount
+        )
+        self.__updated_at = max(now, self.__updated_at)
+        return max(0.0, -self.__tokens / self.per_second)
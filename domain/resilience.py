@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Final, final, Optional
+
+
+# 連続した失敗がしきい値に達したら開き、reset_seconds経過後に1回だけ試行を許す
+# 試行が成功すれば閉じ、失敗すれば再び開く
+# 結果が記録されないまま(キャンセルなど)reset_seconds経過した試行は破棄し、次の試行を許す
+@final
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+        self.failure_threshold: Final = failure_threshold
+        self.reset_seconds: Final = reset_seconds
+        self.__failures: int = 0
+        self.__opened_at: Optional[float] = None
+        self.__trial_started_at: Optional[float] = None
+
+    def allow(self, now: float) -> bool:
+        if self.__opened_at is None:
+            return True
+        if now - self.__opened_at < self.reset_seconds:
+            return False
+        if (
+            self.__trial_started_at is None
+            or now - self.__trial_started_at >= self.reset_seconds
+        ):
+            self.__trial_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_started_at = None
+
+    # allowで試行を許された呼び出しかどうかを、allowに渡した時刻で判定する
+    def is_trial(self, started_at: float) -> bool:
+        return self.__trial_started_at == started_at
+
+    # 試行が結果を残さずに終わった場合(キャンセルなど)に、次の試行を許す
+    # 他の呼び出しが始めた試行は破棄しない
+    def abandon_trial(self, started_at: float) -> None:
+        if self.is_trial(started_at):
+            self.__trial_started_at = None
+
+    # 閉じた状態または試行中から開いた状態に変わった場合にTrueを返す
+    def record_failure(self, now: float) -> bool:
+        self.__failures += 1
+        if self.__trial_started_at is not None or (
+            self.__opened_at is None and self.__failures >= self.failure_threshold
+        ):
+            self.__opened_at = now
+            self.__trial_started_at = None
+            return True
+        return False
+
+
+# 指数的に伸ばした上限の範囲でランダムに待つ(フルジッター)
+def backoff_delay(attempt: int, base: float, cap: float, rand: float) -> float:
+    return rand * min(cap, base * float(2**attempt))
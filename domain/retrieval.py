@@ -0,0 +1,39 @@
+from typing import Final
+
+import numpy as np
+import numpy.typing as npt
+
+type Embeddings = npt.NDArray[np.float32]
+
+
+def normalise_rows(vectors: npt.ArrayLike) -> Embeddings:
+    matrix: Final = np.asarray(vectors, dtype=np.float32)
+    norms: Final = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    # ゼロベクトルはどの質問とも類似度0として扱う
+    return (matrix / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+# 正規化した埋め込みを.npy形式で書き出す(読み込み時にそのままメモリマップできる)
+def write_index(path: str, vectors: npt.ArrayLike) -> None:
+    normalised: Final = normalise_rows(vectors)
+    index: Final = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=normalised.shape
+    )
+    index[:] = normalised
+    index.flush()
+    del index
+
+
+def load_index(path: str) -> Embeddings:
+    index: Final[Embeddings] = np.load(path, mmap_mode="r")
+    return index
+
+
+# 行が正規化済みのため、内積がそのままコサイン類似度になる
+def top_k(index: Embeddings, query: npt.ArrayLike, k: int) -> list[int]:
+    if len(index) == 0 or k <= 0:
+        return []
+    scores: Final = index @ normalise_rows(query)
+    k = min(k, len(scores))
+    candidates: Final = np.argpartition(-scores, k - 1)[:k]
+    return [int(i) for i in candidates[np.argsort(-scores[candidates])]]
@@ -1,6 +1,13 @@
 from datetime import datetime, timezone, timedelta
 
-from domain.assistant import Assistant, AssistantId, ThreadId
+from domain.assistant import (
+    Assistant,
+    AssistantId,
+    PooledAssistant,
+    ThreadId,
+    VectorStore,
+    VectorStoreId,
+)
 from domain.document import DocumentId
 
 
@@ -58,3 +65,44 @@ def test_assistant_use() -> None:
 
     assert assistant.used_at == updated_time
     assert assistant.updated_at == updated_time
+
+
+def test_assistant_new_with_vector_store() -> None:
+    now = datetime.now(timezone.utc)
+    assistant = Assistant.new(
+        _id=AssistantId("123"),
+        document_id=DocumentId("456"),
+        thread_id=ThreadId("789"),
+        now=now,
+        vector_store_id=VectorStoreId("vs"),
+    )
+
+    assert assistant.vector_store_id == "vs"
+
+
+def test_vector_store_new() -> None:
+    now = datetime.now(timezone.utc)
+    vector_store = VectorStore.new(
+        _id=VectorStoreId("vs"),
+        content_hash="hash",
+        now=now,
+    )
+
+    assert vector_store.id == "vs"
+    assert vector_store.content_hash == "hash"
+    assert vector_store.ref_count == 1
+    assert vector_store.created_at == now
+    assert vector_store.updated_at == now
+
+
+def test_pooled_assistant_new() -> None:
+    now = datetime.now(timezone.utc)
+    pooled = PooledAssistant.new(
+        _id=AssistantId("123"),
+        thread_id=ThreadId("789"),
+        now=now,
+    )
+
+    assert pooled.id == "123"
+    assert pooled.thread_id == "789"
+    assert pooled.created_at == now
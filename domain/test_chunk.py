@@ -0,0 +1,99 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from domain.chunk import TokenChunker, chunk_text, estimate_tokens, group_texts
+
+
+def _count_chars(text: str) -> int:
+    return len(text)
+
+
+async def _iter(items: list[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+async def _collect(items: AsyncIterator[str]) -> list[str]:
+    return [item async for item in items]
+
+
+def test_estimate_tokens() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("日本語の論文") == 6
+    assert estimate_tokens("PDFを要約") == 4
+
+
+def test_token_chunker_prefers_paragraph() -> None:
+    chunker = TokenChunker(max_tokens=20, count_tokens=_count_chars)
+
+    chunks = chunker.feed("aaaa bbbb cccc.\n\ndddd eeee. ffff")
+    chunks += chunker.flush()
+
+    assert chunks == ["aaaa bbbb cccc.", "dddd eeee. ffff"]
+
+
+def test_token_chunker_prefers_sentence() -> None:
+    chunker = TokenChunker(max_tokens=20, count_tokens=_count_chars)
+
+    chunks = chunker.feed("一二三四五六七八。九十一二三四五六七八九十")
+    chunks += chunker.flush()
+
+    assert chunks == ["一二三四五六七八。", "九十一二三四五六七八九十"]
+
+
+def test_token_chunker_hard_cut() -> None:
+    chunker = TokenChunker(max_tokens=5, count_tokens=_count_chars)
+
+    chunks = chunker.feed("abcdefghijkl")
+    chunks += chunker.flush()
+
+    assert chunks == ["abcde", "fghij", "kl"]
+
+
+def test_token_chunker_overlap() -> None:
+    chunker = TokenChunker(max_tokens=20, overlap_tokens=9, count_tokens=_count_chars)
+
+    chunks = chunker.feed("aaa. bbb. ccc. ddd. eee. fff.")
+    chunks += chunker.flush()
+
+    assert chunks == ["aaa. bbb. ccc. ddd.", "ccc. ddd. eee. fff."]
+
+
+def test_token_chunker_respects_budget() -> None:
+    text = "これは論文の一文です。" * 50 + "\n\n" + "This is a sentence. " * 50
+
+    chunks = TokenChunker(max_tokens=100, overlap_tokens=10).feed(text)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 100 for c in chunks)
+
+
+def test_token_chunker_invalid_overlap() -> None:
+    with pytest.raises(ValueError):
+        TokenChunker(max_tokens=10, overlap_tokens=5)
+
+
+def test_chunk_text() -> None:
+    chunks = chunk_text(_iter(["abc. ", "def. ", "ghi."]), 8, count_tokens=_count_chars)
+    result = asyncio.run(_collect(chunks))
+
+    assert result == ["abc.", "def.", "ghi."]
+
+
+def test_group_texts() -> None:
+    texts = ["aaa", "bbb", "ccc", "dddddd", "e"]
+
+    groups = group_texts(texts, 6, count_tokens=_count_chars)
+
+    assert groups == [["aaa", "bbb"], ["ccc", "dddddd"], ["e"]]
+
+
+def test_group_texts_always_reduces() -> None:
+    texts = ["a" * 10] * 5
+
+    groups = group_texts(texts, 5, count_tokens=_count_chars)
+
+    assert len(groups) < len(texts)
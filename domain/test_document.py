@@ -1,6 +1,6 @@
 from datetime import datetime, timezone, timedelta
 
-from domain.document import Document, DocumentId, Status
+from domain.document import Document, DocumentId, Status, DocumentSummaryCheckpoint
 from domain.user import UserId
 
 
@@ -93,3 +93,20 @@ def test_document_update_status() -> None:
     assert document.status is Status(Status.READY_ASSISTANT)
     assert document.created_at == now
     assert document.updated_at == updated_time
+
+
+def test_document_summary_checkpoint_new() -> None:
+    now = datetime.now(timezone.utc)
+    checkpoint = DocumentSummaryCheckpoint.new(
+        document_id=DocumentId("123"),
+        source_hash="abc",
+        index=3,
+        text="- summary",
+        now=now,
+    )
+
+    assert checkpoint.document_id == "123"
+    assert checkpoint.source_hash == "abc"
+    assert checkpoint.index == 3
+    assert checkpoint.text == "- summary"
+    assert checkpoint.created_at == now
@@ -0,0 +1,50 @@
+import pytest
+
+from domain.rate_limit import TokenBucket
+
+
+def test_token_bucket_within_capacity() -> None:
+    bucket = TokenBucket(capacity=10, per_second=1, now=0)
+
+    assert bucket.reserve(4, now=0) == 0
+    assert bucket.reserve(6, now=0) == 0
+
+
+def test_token_bucket_waits_in_order() -> None:
+    bucket = TokenBucket(capacity=10, per_second=2, now=0)
+
+    assert bucket.reserve(10, now=0) == 0
+    assert bucket.reserve(4, now=0) == 2
+    assert bucket.reserve(4, now=0) == 4
+
+
+def test_token_bucket_refills() -> None:
+    bucket = TokenBucket(capacity=10, per_second=2, now=0)
+    bucket.reserve(10, now=0)
+
+    assert bucket.reserve(4, now=2) == 0
+    assert bucket.reserve(4, now=100) == 0
+    assert bucket.reserve(10, now=100) == 2
+
+
+def test_token_bucket_clock_goes_backwards() -> None:
+    bucket = TokenBucket(capacity=10, per_second=1, now=10)
+    bucket.reserve(10, now=10)
+
+    # 先に始まった呼び出しが古い時刻で予約しても、残量は補充も減少もしない
+    assert bucket.reserve(0, now=5) == 0
+    assert bucket.reserve(2, now=5) == 2
+    # 補充は記録済みの最新の時刻からの経過分だけで、同じ区間を2回補充しない
+    assert bucket.reserve(2, now=12) == 2
+
+
+def test_token_bucket_per_minute() -> None:
+    bucket = TokenBucket.per_minute(60, now=0)
+
+    assert bucket.capacity == 60
+    assert bucket.per_second == 1
+
+
+def test_token_bucket_invalid() -> None:
+    with pytest.raises(ValueError):
+        TokenBucket(capacity=0, per_second=1, now=0)
@@ -0,0 +1,81 @@
+import pytest
+
+from domain.resilience import CircuitBreaker, backoff_delay
+
+
+def test_circuit_breaker_opens_after_threshold() -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10)
+
+    assert not breaker.record_failure(now=0)
+    assert not breaker.record_failure(now=0)
+    assert breaker.record_failure(now=0)
+    assert not breaker.allow(now=5)
+
+
+def test_circuit_breaker_success_resets_failures() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+
+    breaker.record_failure(now=0)
+    breaker.record_success()
+
+    assert not breaker.record_failure(now=0)
+    assert breaker.allow(now=0)
+
+
+def test_circuit_breaker_half_open() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure(now=0)
+
+    assert breaker.allow(now=10)
+    assert not breaker.allow(now=10)
+    assert breaker.record_failure(now=10)
+    assert not breaker.allow(now=15)
+
+    assert breaker.allow(now=20)
+    breaker.record_success()
+    assert breaker.allow(now=20)
+    assert breaker.allow(now=20)
+
+
+def test_circuit_breaker_cancelled_trial() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure(now=0)
+
+    # 試行が結果を記録しないまま終わっても、reset_seconds後には次の試行を許す
+    assert breaker.allow(now=10)
+    assert not breaker.allow(now=15)
+    assert breaker.allow(now=20)
+    assert not breaker.allow(now=20)
+
+    assert breaker.is_trial(started_at=20)
+    breaker.abandon_trial(started_at=20)
+    assert breaker.allow(now=21)
+    assert not breaker.allow(now=21)
+    breaker.record_success()
+    assert breaker.allow(now=21)
+
+
+def test_circuit_breaker_abandon_other_trial() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure(now=0)
+    assert breaker.allow(now=10)
+
+    # 試行を始めていない呼び出しがキャンセルされても、進行中の試行はそのまま残す
+    assert not breaker.is_trial(started_at=5)
+    breaker.abandon_trial(started_at=5)
+    assert not breaker.allow(now=11)
+
+    breaker.abandon_trial(started_at=10)
+    assert breaker.allow(now=11)
+
+
+def test_circuit_breaker_invalid() -> None:
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0, reset_seconds=10)
+
+
+def test_backoff_delay() -> None:
+    assert backoff_delay(0, base=0.5, cap=8, rand=1) == 0.5
+    assert backoff_delay(3, base=0.5, cap=8, rand=1) == 4
+    assert backoff_delay(10, base=0.5, cap=8, rand=1) == 8
+    assert backoff_delay(10, base=0.5, cap=8, rand=0.5) == 4
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import numpy as np
+
+from domain.retrieval import load_index, normalise_rows, top_k, write_index
+
+_VOCABULARY = ["契約", "解約", "料金", "支払い", "保証", "期間"]
+
+
+# 語彙ごとの出現回数をベクトルにする、ネットワークを使わない埋め込み
+def _embed(texts: list[str]) -> list[list[float]]:
+    return [[float(text.count(word)) for word in _VOCABULARY] for text in texts]
+
+
+_CHUNKS = [
+    "契約の期間は1年です。期間の満了後は自動で更新されます。",
+    "料金は毎月末に支払います。支払い方法は口座振替です。",
+    "製品の保証は購入から2年間です。",
+    "解約は1ヶ月前までに申し出てください。",
+]
+
+
+def test_normalise_rows() -> None:
+    normalised = normalise_rows([[3.0, 4.0], [0.0, 0.0]])
+
+    assert normalised.dtype == np.float32
+    assert np.allclose(normalised, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_top_k_orders_by_cosine_similarity() -> None:
+    index = normalise_rows(_embed(_CHUNKS))
+
+    assert top_k(index, _embed(["支払いの料金"])[0], 2)[0] == 1
+    assert top_k(index, _embed(["保証"])[0], 1) == [2]
+    assert len(top_k(index, _embed(["解約"])[0], 10)) == len(_CHUNKS)
+
+
+def test_top_k_empty() -> None:
+    index = normalise_rows(np.zeros((0, len(_VOCABULARY))))
+
+    assert top_k(index, _embed(["契約"])[0], 3) == []
+
+
+def test_write_and_load_index(tmp_path: Path) -> None:
+    path = str(tmp_path / "embeddings.npy")
+    write_index(path, _embed(_CHUNKS))
+
+    index = load_index(path)
+
+    assert isinstance(index, np.memmap)
+    assert index.shape == (len(_CHUNKS), len(_VOCABULARY))
+    assert top_k(index, _embed(["解約の申し出"])[0], 1) == [3]
@@ -0,0 +1,36 @@
+import asyncio
+from typing import AsyncIterator
+
+from domain.text import TextNormaliser, normalise_question, normalise_text
+
+
+async def _iter(items: list[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+async def _collect(items: AsyncIterator[str]) -> list[str]:
+    return [item async for item in items]
+
+
+def test_text_normaliser_across_pages() -> None:
+    pages = ["Hello  wor-\n", "ld\n\x0c", "  next-", "\npage \n\x0c"]
+
+    normaliser = TextNormaliser()
+    result = "".join(normaliser.feed(page) for page in pages) + normaliser.flush()
+
+    assert result == "Hello world\n\nnextpage\n\n"
+
+
+def test_normalise_text() -> None:
+    result = asyncio.run(_collect(normalise_text(_iter(["a \n", "\n b-", "\nc d"]))))
+
+    assert "".join(result) == "a\n\nbc d"
+
+
+def test_normalise_question() -> None:
+    assert normalise_question("  著者は誰ですか？ ") == "著者は誰ですか"
+    assert normalise_question("著者は　誰ですか?") == "著者は 誰ですか"
+    assert normalise_question("ＰＤＦの結論は。") == "pdfの結論は"
+    assert normalise_question("What is the\nconclusion?!") == "what is the conclusion"
+    assert normalise_question("v1.2") == "v1.2"
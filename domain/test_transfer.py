@@ -0,0 +1,26 @@
+import pytest
+
+from domain.transfer import byte_ranges
+
+
+def test_byte_ranges() -> None:
+    assert byte_ranges(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert byte_ranges(8, 4) == [(0, 4), (4, 8)]
+    assert byte_ranges(3, 4) == [(0, 3)]
+
+
+def test_byte_ranges_cover_whole_object() -> None:
+    ranges = byte_ranges(1000, 7)
+
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_byte_ranges_empty() -> None:
+    assert byte_ranges(0, 4) == []
+
+
+def test_byte_ranges_invalid_slice_size() -> None:
+    with pytest.raises(ValueError):
+        byte_ranges(10, 0)
@@ -0,0 +1,48 @@
+import asyncio
+
+from domain.usage import (
+    UsageTags,
+    current_retries,
+    current_usage_tags,
+    retrying,
+    set_usage_tags,
+)
+
+
+def test_usage_tags_default() -> None:
+    assert current_usage_tags() == UsageTags()
+    assert current_usage_tags().labels() == {"document": "", "user": ""}
+
+
+def test_usage_tags_are_scoped_to_task() -> None:
+    async def _current() -> UsageTags:
+        return current_usage_tags()
+
+    async def request(document_id: str) -> list[UsageTags]:
+        set_usage_tags(document_id, "user")
+        await asyncio.sleep(0)
+        inherited = await asyncio.create_task(_current())
+        threaded = await asyncio.to_thread(current_usage_tags)
+        return [current_usage_tags(), inherited, threaded]
+
+    async def run() -> tuple[list[UsageTags], list[UsageTags]]:
+        return await asyncio.gather(request("a"), request("b"))
+
+    a, b = asyncio.run(run())
+
+    assert a == [UsageTags("a", "user")] * 3
+    assert b == [UsageTags("b", "user")] * 3
+    assert current_usage_tags() == UsageTags()
+
+
+def test_retrying() -> None:
+    async def attempt(retries: int) -> int:
+        with retrying(retries):
+            await asyncio.sleep(0)
+            return await asyncio.to_thread(current_retries)
+
+    async def run() -> tuple[int, int]:
+        return await asyncio.gather(attempt(0), attempt(2))
+
+    assert list(asyncio.run(run())) == [0, 2]
+    assert current_retries() == 0
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import AsyncIterable, AsyncIterator, Final, final
+
+_WHITESPACE: Final = re.compile(r"\s+")
+_LINE_BREAK: Final = re.compile(r"[\n\f]")
+_TRAILING_PUNCTUATION: Final = re.compile(r"[\s?!.。、,]+$")
+
+
+# ハイフネーションの除去と空白の圧縮をページ単位で逐次的に行う
+# 改行を2つ以上含む空白(pdfminerのテキストボックスやページの区切り)は段落の区切りとして残す
+@final
+class TextNormaliser:
+    def __init__(self) -> None:
+        self.__pending: str = ""
+
+    def feed(self, text: str) -> str:
+        buf: Final = self.__pending + text
+        stripped: Final = buf.rstrip()
+        # 次のページとつながる可能性がある末尾の空白と「-」は保留する
+        cut = len(stripped)
+        if stripped.endswith("-"):
+            cut -= 1
+        self.__pending = buf[cut:]
+        return self.__normalise(buf[:cut])
+
+    def flush(self) -> str:
+        rest: Final = self.__pending
+        self.__pending = ""
+        return self.__normalise(rest)
+
+    @staticmethod
+    def __normalise(text: str) -> str:
+        return _WHITESPACE.sub(_collapse, text.replace("-\n", ""))
+
+
+def _collapse(match: re.Match[str]) -> str:
+    return "\n\n" if len(_LINE_BREAK.findall(match.group())) >= 2 else " "
+
+
+async def normalise_text(pages: AsyncIterable[str]) -> AsyncIterator[str]:
+    normaliser: Final = TextNormaliser()
+    async for page in pages:
+        text = normaliser.feed(page)
+        if text:
+            yield text
+    rest: Final = normaliser.flush()
+    if rest:
+        yield rest
+
+
+# 表記の揺れだけが違う質問を同じものとして扱うための正規化
+# 全角半角・大文字小文字・空白・末尾の句読点や疑問符の違いを無視する
+def normalise_question(text: str) -> str:
+    folded: Final = unicodedata.normalize("NFKC", text).casefold()
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", folded).strip())
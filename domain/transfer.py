@@ -0,0 +1,7 @@
+# [start, end)の範囲に分割する(最後の範囲だけslice_sizeより短くなる)
+def byte_ranges(size: int, slice_size: int) -> list[tuple[int, int]]:
+    if slice_size <= 0:
+        raise ValueError("slice_size must be positive")
+    return [
+        (start, min(start + slice_size, size)) for start in range(0, size, slice_size)
+    ]
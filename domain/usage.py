@@ -0,0 +1,47 @@
+import dataclasses
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Final, final, Iterator
+
+
+# 外部APIの利用量を集計するときに付けるドキュメントとユーザー
+@final
+@dataclasses.dataclass(frozen=True)
+class UsageTags:
+    document_id: str = ""
+    user_id: str = ""
+
+    def labels(self) -> dict[str, str]:
+        return {"document": self.document_id, "user": self.user_id}
+
+
+_usage_tags: Final[ContextVar[UsageTags]] = ContextVar(
+    "usage_tags", default=UsageTags()
+)
+
+
+# リクエストごとのタスクの中で設定する
+# そこから作られたタスクやasyncio.to_threadのスレッドにも引き継がれる
+def set_usage_tags(document_id: str, user_id: str) -> None:
+    _usage_tags.set(UsageTags(document_id=document_id, user_id=user_id))
+
+
+def current_usage_tags() -> UsageTags:
+    return _usage_tags.get()
+
+
+_retries: Final[ContextVar[int]] = ContextVar("retries", default=0)
+
+
+# 依存先の呼び出しの間だけ、それまでにリトライした回数を設定する
+@contextmanager
+def retrying(retries: int) -> Iterator[None]:
+    token: Final = _retries.set(retries)
+    try:
+        yield
+    finally:
+        _retries.reset(token)
+
+
+def current_retries() -> int:
+    return _retries.get()
@@ -2,7 +2,12 @@ import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Final
 
-from adapter.adapter import OpenAIAdapter, AssistantRepository, AssistantFSRepository
+from adapter.adapter import (
+    OpenAIAdapter,
+    AssistantRepository,
+    AssistantFSRepository,
+    VectorStoreAdapter,
+)
 from di.di import container
 from domain.document import Status
 
@@ -11,6 +16,7 @@ async def _main() -> None:
     openai_adapter: OpenAIAdapter = container.openai_adapter()
     assistant_repository: AssistantRepository = container.assistant_repository()
     assistant_fs_repository: AssistantFSRepository = container.assistant_fs_repository()
+    vector_store_adapter: VectorStoreAdapter = container.vector_store_adapter()
 
     now: Final[datetime] = datetime.now(timezone.utc)
     target: Final[datetime] = now - timedelta(hours=3)
@@ -21,6 +27,8 @@ async def _main() -> None:
 
         document.update_status(Status.PREPARE_ASSISTANT, now)
         await openai_adapter.delete_assistant(assistant.id)
+        if assistant.vector_store_id is not None:
+            await vector_store_adapter.release(assistant.vector_store_id)
         await assistant_repository.delete_with_update_document(document.id, document)
         await assistant_fs_repository.delete(assistant.id)
 
@@ -11,6 +11,7 @@ from di.di import container
 from handler import api_handler
 from handler.api_handler.document import router as document_router
 from handler.api_handler.me import router as me_router
+from handler.api_handler.metrics import router as metrics_router
 from handler.api_handler.middleware.auth import AuthMiddleware
 from handler.api_handler.middleware.error import ErrorMiddleware
 from handler.api_handler.middleware.log import LogMiddleware
@@ -39,6 +40,7 @@ app.include_router(user_router)
 app.include_router(document_router)
 app.include_router(subscriber_router)
 app.include_router(pre_sign_url_router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(RequestValidationError)
@@ -1,9 +1,11 @@
+import asyncio
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import Final, final, Optional
+from typing import AsyncIterator, Final, final, Optional
 
 from dependency_injector.wiring import Provide, inject
 from fastapi import APIRouter, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from adapter.adapter import (
@@ -15,17 +17,33 @@ from adapter.adapter import (
     AssistantFSRepository,
     MessageFSRepository,
     DocumentSummaryRepository,
+    LogAdapter,
     Pager,
+    VectorStoreAdapter,
+)
+from config.envs import (
+    DEFAULT_BUCKET_NAME,
+    SUMMARY_STREAM_POLL_SECONDS,
+    SUMMARY_STREAM_TIMEOUT_SECONDS,
 )
-from config.envs import DEFAULT_BUCKET_NAME
 from di.di import AppContainer
-from domain.document import Document, DocumentId, Status
+from domain.document import (
+    Document,
+    DocumentId,
+    Status,
+    DocumentSummary,
+    SummaryRunId,
+    new_summary_run_id,
+)
+from domain.assistant import Message
 from domain.error import AppError, ErrorKind
+from domain.usage import set_usage_tags
 from domain.user import UserId
 from handler.api_handler.response import (
     DocumentResp,
     EmptyResp,
     DocumentWithUserAndAssistantResp,
+    DocumentSummaryResp,
     MessageResp,
     TextResp,
     WithPagerResp,
@@ -33,6 +51,8 @@ from handler.api_handler.response import (
 from handler.util import extract_gs_key
 
 router: Final = APIRouter()
+# クライアントの切断後も続くタスクがGCで回収されないよう参照を保持する
+_background_tasks: Final[set[asyncio.Task[Message]]] = set()
 
 
 @router.get("/documents")
@@ -153,6 +173,9 @@ async def _delete_document(
     assistant_fs_repository: AssistantFSRepository = Depends(
         Provide[AppContainer.assistant_fs_repository]
     ),
+    vector_store_adapter: VectorStoreAdapter = Depends(
+        Provide[AppContainer.vector_store_adapter]
+    ),
 ) -> EmptyResp:
     uid: Final[UserId] = request.state.uid
 
@@ -172,6 +195,8 @@ async def _delete_document(
     assistant: Final = await assistant_repository.get(document.id)
     if assistant is not None:
         await openai_adapter.delete_assistant(assistant.id)
+        if assistant.vector_store_id is not None:
+            await vector_store_adapter.release(assistant.vector_store_id)
         await document_repository.delete_with_assistant(document.id)
         await assistant_fs_repository.delete(assistant.id)
     else:
@@ -287,11 +312,108 @@ async def _create_message(
     return JSONResponse(content={}, status_code=201)
 
 
+@router.post("/documents/{document_id}/messages/stream")
+@inject
+async def _stream_message(
+    request: Request,
+    document_id: DocumentId,
+    payload: _CreateMessagePayload,
+    log_adapter: LogAdapter = Depends(Provide[AppContainer.log_adapter]),
+    openai_adapter: OpenAIAdapter = Depends(Provide[AppContainer.openai_adapter]),
+    document_repository: DocumentRepository = Depends(
+        Provide[AppContainer.document_repository]
+    ),
+    assistant_repository: AssistantRepository = Depends(
+        Provide[AppContainer.assistant_repository]
+    ),
+    message_fs_repository: MessageFSRepository = Depends(
+        Provide[AppContainer.message_fs_repository]
+    ),
+) -> StreamingResponse:
+    uid: Final[UserId] = request.state.uid
+    now: Final = datetime.now(timezone.utc)
+
+    document: Final = await document_repository.get(document_id)
+    if not document:
+        raise AppError(
+            ErrorKind.NOT_FOUND, f"ドキュメントが見つかりません: {document_id}"
+        )
+    if document.user_id != uid:
+        raise AppError(ErrorKind.FORBIDDEN, f"権限がありません: {uid}")
+    if document.status != Status.READY_ASSISTANT:
+        raise AppError(ErrorKind.BAD_REQUEST, "アシスタントが準備できていません")
+    set_usage_tags(document.id, uid)
+
+    assistant: Final = await assistant_repository.get(document.id)
+    if not assistant:
+        raise AppError(
+            ErrorKind.NOT_FOUND, f"アシスタントが見つかりません: {document.id}"
+        )
+
+    assistant.use(now)
+    await assistant_repository.update(assistant)
+
+    my_message: Final = Message.new(assistant.thread_id, "user", payload.message, now)
+    texts: Final[asyncio.Queue[Optional[str]]] = asyncio.Queue()
+
+    # 応答の受信と保存はレスポンスとは別のタスクで行い、クライアントが切断しても最後まで続ける
+    async def answer() -> Message:
+        received: Final[list[str]] = []
+        try:
+            async with aclosing(
+                openai_adapter.stream_chat_assistant(assistant, payload.message)
+            ) as stream:
+                async for text in stream:
+                    received.append(text)
+                    texts.put_nowait(text)
+        finally:
+            texts.put_nowait(None)
+            await message_fs_repository.put(assistant, my_message)
+
+        assistant_message: Final = Message.new(
+            assistant.thread_id,
+            "assistant",
+            "".join(received),
+            datetime.now(timezone.utc),
+        )
+        await message_fs_repository.put(assistant, assistant_message)
+        return assistant_message
+
+    def on_done(_task: asyncio.Task[Message]) -> None:
+        _background_tasks.discard(_task)
+        if not _task.cancelled() and (e := _task.exception()) is not None:
+            log_adapter.log_error(e if isinstance(e, Exception) else Exception(e))
+
+    task: Final = asyncio.create_task(answer())
+    _background_tasks.add(task)
+    task.add_done_callback(on_done)
+
+    async def events() -> AsyncIterator[str]:
+        while (text := await texts.get()) is not None:
+            yield _sse_event("token", TextResp(text=text))
+        try:
+            message = await asyncio.shield(task)
+        except AppError as e:
+            yield _sse_event("error", TextResp(text=e.message))
+            return
+        except Exception:
+            yield _sse_event("error", TextResp(text="サーバーエラーが発生しました"))
+            return
+        yield _sse_event("done", MessageResp.from_model(message))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/documents/{document_id}/summaries")
 @inject
 async def _list_document_summary(
     request: Request,
     document_id: DocumentId,
+    top_only: bool = False,
     document_repository: DocumentRepository = Depends(
         Provide[AppContainer.document_repository]
     ),
@@ -309,11 +431,99 @@ async def _list_document_summary(
     if document.user_id != uid:
         raise AppError(ErrorKind.FORBIDDEN, f"権限がありません: {uid}")
 
-    summaries: Final = await document_summary_repository.find_by_document(document.id)
+    # top_only=trueの場合はドキュメント全体の要約(最上位の階層)のみを返す
+    summaries: Final = (
+        await document_summary_repository.find_top_by_document(document.id)
+        if top_only
+        else await document_summary_repository.find_by_document(document.id)
+    )
 
     return [TextResp(text=summary.text) for summary in summaries]
 
 
+@router.get("/documents/{document_id}/summaries/stream")
+@inject
+async def _stream_document_summary(
+    request: Request,
+    document_id: DocumentId,
+    run_id: Optional[SummaryRunId] = None,
+    document_repository: DocumentRepository = Depends(
+        Provide[AppContainer.document_repository]
+    ),
+    document_summary_repository: DocumentSummaryRepository = Depends(
+        Provide[AppContainer.document_summary_repository]
+    ),
+) -> StreamingResponse:
+    uid: Final[UserId] = request.state.uid
+
+    document: Final = await document_repository.get(document_id)
+    if not document:
+        raise AppError(
+            ErrorKind.NOT_FOUND, f"ドキュメントが見つかりません: {document_id}"
+        )
+    if document.user_id != uid:
+        raise AppError(ErrorKind.FORBIDDEN, f"権限がありません: {uid}")
+
+    # 要約はワーカー側で進むため、DBをポーリングして完了したチャンクの要約をindex順に送る
+    # 統合した要約(levelが1以上)が保存されたら、それらを送って終了する
+    # run_idを指定した場合は、そのリクエストで作られた要約だけを対象にする
+    async def events() -> AsyncIterator[str]:
+        loop: Final = asyncio.get_running_loop()
+        deadline: Final = loop.time() + SUMMARY_STREAM_TIMEOUT_SECONDS
+        next_index = 0
+        while loop.time() < deadline:
+            if await request.is_disconnected():
+                return
+
+            summaries = [
+                s
+                for s in await document_summary_repository.find_by_document(
+                    document.id
+                )
+                if run_id is None or s.run_id == run_id
+            ]
+            chunks = {s.index: s for s in summaries if s.level == 0}
+            sent = False
+            while next_index in chunks:
+                yield _summary_event(chunks[next_index])
+                next_index += 1
+                sent = True
+
+            reduced = [s for s in summaries if s.level > 0]
+            # テキストのないPDFは、空の最上位の要約だけが保存されて完了する
+            if reduced and not chunks and not any(s.text for s in reduced):
+                yield _sse_event(
+                    "error", TextResp(text="PDFからテキストを抽出できませんでした")
+                )
+                return
+            if reduced:
+                for summary in reduced:
+                    yield _summary_event(summary)
+                yield "event: done\ndata: {}\n\n"
+                return
+
+            # 接続が途中で切られないよう、送るものがなくても定期的にコメントを送る
+            if not sent:
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(SUMMARY_STREAM_POLL_SECONDS)
+
+        yield "event: timeout\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _summary_event(summary: DocumentSummary) -> str:
+    return _sse_event("summary", DocumentSummaryResp.from_model(summary))
+
+
+def _sse_event(event: str, data: BaseModel) -> str:
+    return f"event: {event}\ndata: {data.model_dump_json()}\n\n"
+
+
 @router.post("/documents/{document_id}/summaries")
 @inject
 async def _summarise_document(
@@ -336,10 +546,12 @@ async def _summarise_document(
     if document.user_id != uid:
         raise AppError(ErrorKind.FORBIDDEN, f"権限がありません: {uid}")
 
+    # 以前の要約はワーカーが置き換えるまで残しておき、ストリームはrun_idで区別する
+    run_id: Final = new_summary_run_id()
     await task_queue_adapter.send_queue(
         "summarise-document",
         "/subscriber/summarise_document",
-        {"document_id": document.id},
+        {"document_id": document.id, "run_id": run_id},
     )
 
-    return JSONResponse(content={}, status_code=201)
+    return JSONResponse(content={"run_id": run_id}, status_code=201)
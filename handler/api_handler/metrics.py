@@ -0,0 +1,17 @@
+from typing import Final
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+
+from adapter.adapter import MetricsAdapter
+from di.di import AppContainer
+
+router: Final = APIRouter()
+
+
+@router.get("/metrics")
+@inject
+async def _metrics(
+    metrics_adapter: MetricsAdapter = Depends(Provide[AppContainer.metrics_adapter]),
+) -> dict[str, dict[str, float]]:
+    return metrics_adapter.snapshot()
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from typing import Final, final
 
@@ -5,11 +6,16 @@ from dependency_injector.wiring import Provide, inject
 from fastapi import Request, Depends, APIRouter
 from pydantic import BaseModel
 
-from adapter.adapter import StorageAdapter
+from adapter.adapter import CacheAdapter, StorageAdapter
+from config.envs import PRE_SIGNED_GET_URL_EXPIRATION_MINUTES, PRE_SIGNED_GET_URLS_MAX
 from di.di import AppContainer
 from domain.error import AppError, ErrorKind
 from domain.user import UserId
-from handler.api_handler.response import PreSignUploadResp, PreSignGetResp
+from handler.api_handler.response import (
+    PreSignUploadResp,
+    PreSignGetResp,
+    PreSignGetBatchResp,
+)
 from handler.util import extract_gs_key
 
 router: Final = APIRouter()
@@ -54,10 +60,66 @@ class _PreSignedGetUrlPayload(BaseModel):
 async def _pre_signed_get_url(
     payload: _PreSignedGetUrlPayload,
     storage_adapter: StorageAdapter = Depends(Provide[AppContainer.storage_adapter]),
+    pre_signed_url_cache_adapter: CacheAdapter = Depends(
+        Provide[AppContainer.pre_signed_url_cache_adapter]
+    ),
 ) -> PreSignGetResp:
     key: Final = extract_gs_key(payload.gs_url)
     if not key:
         raise AppError(ErrorKind.BAD_REQUEST, "gs_urlが不正です")
-    url: Final = await storage_adapter.gen_pre_signed_get_url(key)
+    url: Final = await _signed_get_url(
+        key, storage_adapter, pre_signed_url_cache_adapter
+    )
 
     return PreSignGetResp(url=url)
+
+
+@final
+class _PreSignedGetUrlsPayload(BaseModel):
+    gs_urls: list[str]
+
+
+# 一覧画面で表示するファイルの署名付きURLをまとめて発行し、gs_urlごとに返す
+@router.post("/pre_signed_get_urls")
+@inject
+async def _pre_signed_get_urls(
+    payload: _PreSignedGetUrlsPayload,
+    storage_adapter: StorageAdapter = Depends(Provide[AppContainer.storage_adapter]),
+    pre_signed_url_cache_adapter: CacheAdapter = Depends(
+        Provide[AppContainer.pre_signed_url_cache_adapter]
+    ),
+) -> PreSignGetBatchResp:
+    gs_urls: Final = list(dict.fromkeys(payload.gs_urls))
+    if len(gs_urls) > PRE_SIGNED_GET_URLS_MAX:
+        raise AppError(
+            ErrorKind.BAD_REQUEST, f"gs_urlsは{PRE_SIGNED_GET_URLS_MAX}件までです"
+        )
+    keys: Final[list[str]] = []
+    for gs_url in gs_urls:
+        key = extract_gs_key(gs_url)
+        if not key:
+            raise AppError(ErrorKind.BAD_REQUEST, f"gs_urlが不正です: {gs_url}")
+        keys.append(key)
+
+    urls: Final = await asyncio.gather(
+        *(
+            _signed_get_url(key, storage_adapter, pre_signed_url_cache_adapter)
+            for key in keys
+        )
+    )
+
+    return PreSignGetBatchResp(urls=dict(zip(gs_urls, urls)))
+
+
+# 期限の少し前までは以前に発行したURLを返し、署名をやり直さない
+async def _signed_get_url(
+    key: str, storage_adapter: StorageAdapter, cache_adapter: CacheAdapter
+) -> str:
+    cached: Final = await cache_adapter.get(key)
+    if cached is not None:
+        return cached
+    url: Final = await storage_adapter.gen_pre_signed_get_url(
+        key, expiration_minutes=PRE_SIGNED_GET_URL_EXPIRATION_MINUTES
+    )
+    await cache_adapter.put(key, url)
+    return url
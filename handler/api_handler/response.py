@@ -6,7 +6,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 from domain.assistant import AssistantId, ThreadId, Assistant, MessageId, Message
-from domain.document import Document, Status, DocumentId
+from domain.document import Document, Status, DocumentId, DocumentSummary
 from domain.user import User, UserId
 
 
@@ -126,6 +126,20 @@ class MessageResp(BaseModel):
         )
 
 
+class DocumentSummaryResp(BaseModel):
+    index: int
+    level: int
+    text: str
+
+    @classmethod
+    def from_model(cls, summary: DocumentSummary) -> DocumentSummaryResp:
+        return cls(
+            index=summary.index,
+            level=summary.level,
+            text=summary.text,
+        )
+
+
 class PreSignUploadResp(BaseModel):
     url: str
     key: str
@@ -135,6 +149,10 @@ class PreSignGetResp(BaseModel):
     url: str
 
 
+class PreSignGetBatchResp(BaseModel):
+    urls: dict[str, str]
+
+
 class EmptyResp(BaseModel):
     pass
 
@@ -1,28 +1,53 @@
+import asyncio
 import base64
+import hashlib
 import re
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import Final, final
+from typing import BinaryIO, Final, final, Optional
 
 import pandas as pd
 from dependency_injector.wiring import Provide, inject
 from fastapi import APIRouter, Depends
-from pdfminer.high_level import extract_text
 from pydantic import BaseModel
 
 from adapter.adapter import (
     OpenAIAdapter,
     AssistantRepository,
     DocumentRepository,
-    StorageAdapter,
+    DownloadAdapter,
     AssistantFSRepository,
     MessageFSRepository,
     DocumentSummaryRepository,
     ChatMessage,
+    PdfAdapter,
+    CacheAdapter,
+    DocumentSummaryCheckpointRepository,
+    VectorStoreAdapter,
+    AssistantPoolAdapter,
+    TaskQueueAdapter,
+)
+from config.envs import (
+    ASSISTANT_POOL_SIZE,
+    OPENAI_MODEL,
+    SUMMARY_CONCURRENCY,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_CHUNK_OVERLAP_TOKENS,
 )
 from di.di import AppContainer
 from domain.assistant import Assistant, Message
-from domain.document import DocumentId, Status, DocumentSummary, Document
+from domain.document import (
+    DocumentId,
+    Status,
+    DocumentSummary,
+    Document,
+    DocumentSummaryCheckpoint,
+    SummaryRunId,
+)
 from domain.error import AppError, ErrorKind
+from domain.chunk import chunk_text, group_texts
+from domain.text import normalise_question, normalise_text
+from domain.usage import set_usage_tags
 from domain.user import UserId
 from handler.api_handler.response import EmptyResp
 from handler.util import extract_gs_key
@@ -44,8 +69,9 @@ class _CreateAssistantPayload(BaseModel):
 @inject
 async def _create_assistant(
     payload: _CreateAssistantPayload,
-    openai_adapter: OpenAIAdapter = Depends(Provide[AppContainer.openai_adapter]),
-    storage_adapter: StorageAdapter = Depends(Provide[AppContainer.storage_adapter]),
+    download_adapter: DownloadAdapter = Depends(
+        Provide[AppContainer.download_adapter]
+    ),
     assistant_repository: AssistantRepository = Depends(
         Provide[AppContainer.assistant_repository]
     ),
@@ -55,6 +81,16 @@ async def _create_assistant(
     assistant_fs_repository: AssistantFSRepository = Depends(
         Provide[AppContainer.assistant_fs_repository]
     ),
+    vector_store_adapter: VectorStoreAdapter = Depends(
+        Provide[AppContainer.vector_store_adapter]
+    ),
+    assistant_pool_adapter: AssistantPoolAdapter = Depends(
+        Provide[AppContainer.assistant_pool_adapter]
+    ),
+    task_queue_adapter: TaskQueueAdapter = Depends(
+        Provide[AppContainer.task_queue_adapter]
+    ),
+    openai_adapter: OpenAIAdapter = Depends(Provide[AppContainer.openai_adapter]),
 ) -> EmptyResp:
     now: Final = datetime.now(timezone.utc)
 
@@ -65,23 +101,53 @@ async def _create_assistant(
     document: Final = await document_repository.get(payload.document_id)
     if not document:
         raise AppError(ErrorKind.NOT_FOUND, "ドキュメントが見つかりません")
+    set_usage_tags(document.id, document.user_id)
 
     document.update_status(Status.READY_ASSISTANT, now)
 
     key: Final = extract_gs_key(document.gs_file_url)
     if not key:
         raise AppError(ErrorKind.INTERNAL, "ファイルのURLが不正です")
-    destination_file_name: Final = f"/tmp/{document.id}_downloaded.pdf"
-    await storage_adapter.download_object(key, destination_file_name)
 
-    assistant_id, thread_id = await openai_adapter.create_assistant(
-        document.id,
-        destination_file_name,
-    )
-    assistant: Final = Assistant.new(assistant_id, document.id, thread_id, now)
-    await assistant_repository.insert_with_update_document(assistant, document)
-    await assistant_fs_repository.put(assistant)
+    async with download_adapter.download(key) as pdf:
+        vector_store_id: Final = await vector_store_adapter.acquire(pdf)
+    assistant: Optional[Assistant] = None
+    try:
+        assistant_id, thread_id = await assistant_pool_adapter.take(
+            document.id,
+            vector_store_id,
+        )
+        assistant = Assistant.new(
+            assistant_id, document.id, thread_id, now, vector_store_id
+        )
+        # リトライ時はCloud SQLの行で作成済みと判断するため、Firestoreに保存してから最後に挿入する
+        await assistant_fs_repository.put(assistant)
+        await assistant_repository.insert_with_update_document(assistant, document)
+    except Exception:
+        # 途中で失敗した場合は、取り出したアシスタントと確保したベクトルストアを後始末する
+        if assistant is not None:
+            await assistant_fs_repository.delete(assistant.id)
+            await openai_adapter.delete_assistant(assistant.id)
+        await vector_store_adapter.release(vector_store_id)
+        raise
+
+    # 取り出した分を補充する
+    if ASSISTANT_POOL_SIZE > 0:
+        await task_queue_adapter.send_queue(
+            "refill-assistant-pool", "/subscriber/refill_assistant_pool", {}
+        )
+
+    return EmptyResp()
+
 
+@router.post("/subscriber/refill_assistant_pool")
+@inject
+async def _refill_assistant_pool(
+    assistant_pool_adapter: AssistantPoolAdapter = Depends(
+        Provide[AppContainer.assistant_pool_adapter]
+    ),
+) -> EmptyResp:
+    await assistant_pool_adapter.refill()
     return EmptyResp()
 
 
@@ -105,12 +171,16 @@ async def _create_message(
     message_fs_repository: MessageFSRepository = Depends(
         Provide[AppContainer.message_fs_repository]
     ),
+    answer_cache_adapter: CacheAdapter = Depends(
+        Provide[AppContainer.answer_cache_adapter]
+    ),
 ) -> EmptyResp:
     now: Final = datetime.now(timezone.utc)
 
     document: Final = await document_repository.get(payload.document_id)
     if not document:
         raise AppError(ErrorKind.NOT_FOUND, "ドキュメントが見つかりません")
+    set_usage_tags(document.id, document.user_id)
 
     assistant: Final = await assistant_repository.get(document.id)
     if not assistant:
@@ -126,7 +196,12 @@ async def _create_message(
     )
     await message_fs_repository.put(assistant, my_message)
 
-    answer: Final = await openai_adapter.chat_assistant(assistant, payload.message)
+    # 同じドキュメントへの同じ質問は、アシスタントを実行せずに以前の回答を返す
+    cache_key: Final = _answer_cache_key(assistant, payload.message)
+    answer = await answer_cache_adapter.get(cache_key)
+    if answer is None:
+        answer = await openai_adapter.chat_assistant(assistant, payload.message)
+        await answer_cache_adapter.put(cache_key, answer)
 
     assistant_message: Final = Message.new(
         assistant.thread_id, "assistant", answer, datetime.now(timezone.utc)
@@ -139,20 +214,31 @@ async def _create_message(
 @final
 class _SummariseDocumentPayload(BaseModel):
     document_id: DocumentId
+    # run_idを持たないタスク(変更前に登録されたもの)は空文字で扱う
+    run_id: SummaryRunId = SummaryRunId("")
 
 
 @router.post("/subscriber/summarise_document")
 @inject
 async def _summarise(
     payload: _SummariseDocumentPayload,
-    storage_adapter: StorageAdapter = Depends(Provide[AppContainer.storage_adapter]),
+    download_adapter: DownloadAdapter = Depends(
+        Provide[AppContainer.download_adapter]
+    ),
     openai_adapter: OpenAIAdapter = Depends(Provide[AppContainer.openai_adapter]),
+    pdf_adapter: PdfAdapter = Depends(Provide[AppContainer.pdf_adapter]),
     document_repository: DocumentRepository = Depends(
         Provide[AppContainer.document_repository]
     ),
     document_summary_repository: DocumentSummaryRepository = Depends(
         Provide[AppContainer.document_summary_repository]
     ),
+    document_summary_checkpoint_repository: DocumentSummaryCheckpointRepository = (
+        Depends(Provide[AppContainer.document_summary_checkpoint_repository])
+    ),
+    summary_cache_adapter: CacheAdapter = Depends(
+        Provide[AppContainer.summary_cache_adapter]
+    ),
 ) -> EmptyResp:
     now: Final = datetime.now(timezone.utc)
 
@@ -161,61 +247,199 @@ async def _summarise(
         raise AppError(
             ErrorKind.NOT_FOUND, f"ドキュメントが見つかりません: {payload.document_id}"
         )
+    set_usage_tags(document.id, document.user_id)
 
-    key: Final = extract_gs_key(document.gs_file_url)
-    if not key:
-        raise AppError(ErrorKind.INTERNAL, "ファイルのURLが不正です")
-    destination_file_name: Final = f"/tmp/{document.id}_downloaded.pdf"
-    await storage_adapter.download_object(key, destination_file_name)
+    def create_prompt(_text: str, index: int) -> str:
+        return f"""以下は日本語の研究論文の一部です。この論文を簡潔に要約してください。
+これは論文を分割したうちの{index + 1}番目の部分です。
 
-    text = extract_text(destination_file_name)
-    text = text.replace("-\n", "")
-    text = re.sub(r"\s+", " ", text)
+以下のルールに従ってください：
+・箇条書き形式で出力する (先頭は「- 」を使う)
+・簡潔かつわかりやすく要約する
+・不明な専門用語がある場合はそのまま残す
 
-    wc_max: Final = 10000
+それでは開始します。
 
-    def split_text(_text: str) -> list[str]:
-        chunks = [_text[_i : _i + wc_max] for _i in range(0, len(_text), wc_max)]
-        return chunks
+日本語の論文の一部:
+{_text}
 
-    def create_prompt(_text: str, total: int) -> str:
-        return f"""以下は日本語の研究論文の一部です。この論文を簡潔に要約してください。
-論文は全部で{total + 1}個に分割されています。
+要約:"""
+
+    def create_reduce_prompt(_texts: list[str]) -> str:
+        joined = "\n\n".join(
+            f"部分{i + 1}の要約:\n{t}" for i, t in enumerate(_texts)
+        )
+        return f"""以下は日本語の研究論文を分割し、部分ごとに要約したものです。これらを統合し、論文全体として一貫した要約を作成してください。
 
 以下のルールに従ってください：
 ・箇条書き形式で出力する (先頭は「- 」を使う)
+・部分間で重複する内容はまとめる
 ・簡潔かつわかりやすく要約する
 ・不明な専門用語がある場合はそのまま残す
 
 それでは開始します。
 
-日本語の論文の一部:
-{_text}
+{joined}
 
 要約:"""
 
-    parted_text: Final = split_text(text)
-    summaries: Final[list[DocumentSummary]] = []
-    for i in range(len(parted_text)):
-        messages: list[ChatMessage] = [
-            ChatMessage(
-                role="system",
-                content="あなたはPDFを要約する専門家です。あなたは前後に問い合わせした内容を考慮して思慮深い回答をします。",
-            ),
-            ChatMessage(
-                role="user", content=create_prompt(parted_text[i], len(parted_text))
-            ),
-        ]
-        resp = await openai_adapter.chat_completion(messages)
-        summaries.append(DocumentSummary.new(document.id, resp, i, now))
-
-    await document_summary_repository.delete_by_document(document.id)
-    for summary in summaries:
-        await document_summary_repository.insert(summary)
+    key: Final = extract_gs_key(document.gs_file_url)
+    if not key:
+        raise AppError(ErrorKind.INTERNAL, "ファイルのURLが不正です")
+
+    # PDFはチャンクの抽出が終わるまで使い、要約の統合を待たずに削除する
+    async with download_adapter.download(key) as pdf:
+        # リトライ時は同じ内容・同じ分割設定で要約済みのチャンクから再開する
+        source_hash: Final = await asyncio.to_thread(_summary_source_hash, pdf)
+        await document_summary_checkpoint_repository.delete_by_document(
+            document.id, keep_source_hash=source_hash
+        )
+        done: Final = {
+            c.index: c.text
+            for c in await document_summary_checkpoint_repository.find_by_document(
+                document.id, source_hash
+            )
+        }
+        # 要約済みのチャンクから順に公開し、完了したチャンクはその都度追加していく
+        await document_summary_repository.replace_for_document(
+            document.id,
+            [
+                DocumentSummary.new(document.id, t, i, 0, payload.run_id, now)
+                for i, t in sorted(done.items())
+            ],
+        )
+
+        async def complete(prompt: str) -> str:
+            messages: Final[list[ChatMessage]] = [
+                ChatMessage(
+                    role="system",
+                    content="あなたはPDFを要約する専門家です。あなたは前後に問い合わせした内容を考慮して思慮深い回答をします。",
+                ),
+                ChatMessage(role="user", content=prompt),
+            ]
+            # PDFが変わっていなければ同じプロンプトになるため、以前の要約を再利用する
+            cache_key: Final = _summary_cache_key(messages)
+            resp = await summary_cache_adapter.get(cache_key)
+            if resp is None:
+                resp = await openai_adapter.chat_completion(messages)
+                await summary_cache_adapter.put(cache_key, resp)
+            return resp
+
+        semaphore: Final = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+        async def summarise_chunk(_text: str, index: int) -> str:
+            try:
+                resp = await complete(create_prompt(_text, index))
+                completed_at = datetime.now(timezone.utc)
+                await document_summary_checkpoint_repository.insert(
+                    DocumentSummaryCheckpoint.new(
+                        document.id, source_hash, index, resp, completed_at
+                    )
+                )
+                await document_summary_repository.insert(
+                    DocumentSummary.new(
+                        document.id, resp, index, 0, payload.run_id, completed_at
+                    )
+                )
+                return resp
+            finally:
+                semaphore.release()
+
+        async def reduce_group(_texts: list[str]) -> str:
+            # 1件だけのグループは統合する必要がないため、そのまま上の階層に引き継ぐ
+            if len(_texts) == 1:
+                return _texts[0]
+            async with semaphore:
+                return await complete(create_reduce_prompt(_texts))
+
+        # ページ単位で抽出・正規化し、チャンクが埋まり次第要約に回す
+        # 要約中のチャンク数をセマフォで制限し、同時にメモリ上に保持するテキストを抑える
+        tasks: Final[dict[int, asyncio.Task[str]]] = {}
+        total = 0
+        try:
+            async with aclosing(pdf_adapter.extract_pages(pdf)) as pages:
+                async for chunk in chunk_text(
+                    normalise_text(pages),
+                    SUMMARY_CHUNK_TOKENS,
+                    SUMMARY_CHUNK_OVERLAP_TOKENS,
+                ):
+                    index = total
+                    total += 1
+                    if index in done:
+                        continue
+                    await semaphore.acquire()
+                    tasks[index] = asyncio.create_task(summarise_chunk(chunk, index))
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+    results: Final = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    texts: Final[dict[int, str]] = dict(done)
+    errors: Final[dict[int, BaseException]] = {}
+    for index, result in zip(tasks, results):
+        if isinstance(result, BaseException):
+            errors[index] = result
+        else:
+            texts[index] = result
+
+    # 完了したチャンクはチェックポイントに残っているため、リトライ時はそこから再開する
+    if errors:
+        raise AppError(
+            ErrorKind.INTERNAL,
+            f"要約に失敗したチャンクがあります: {sorted(errors)}",
+        ) from next(iter(errors.values()))
+
+    # チャンクごとの要約を木構造で段階的に統合し、各段のグループは並列に要約する
+    # 統合の結果もキャッシュされるため、リトライ時に同じ統合を繰り返すことはない
+    # 1段目以上の要約があることを要約の完了とみなすため、チャンクが1つでも1段は作る
+    levels: Final[list[list[str]]] = [[texts[i] for i in range(total)]]
+    # テキストのないPDFは、空の最上位の要約を保存して完了したことを示す
+    if total == 0:
+        levels.append([""])
+    while len(levels) == 1 or len(levels[-1]) > 1:
+        groups = group_texts(levels[-1], SUMMARY_CHUNK_TOKENS)
+        levels.append(await asyncio.gather(*(reduce_group(g) for g in groups)))
+
+    summaries: Final = [
+        DocumentSummary.new(document.id, text, index, level, payload.run_id, now)
+        for level, level_texts in enumerate(levels)
+        for index, text in enumerate(level_texts)
+    ]
+    await document_summary_repository.replace_for_document(document.id, summaries)
+    await document_summary_checkpoint_repository.delete_by_document(document.id)
 
     return EmptyResp()
 
 
+def _summary_source_hash(pdf: BinaryIO) -> str:
+    digest: Final = hashlib.sha256()
+    pdf.seek(0)
+    for chunk in iter(lambda: pdf.read(1024 * 1024), b""):
+        digest.update(chunk)
+    # 分割の設定やモデルが変わるとチャンクの区切りや要約が変わるため、キーに含める
+    digest.update(
+        f"{OPENAI_MODEL}:{SUMMARY_CHUNK_TOKENS}:{SUMMARY_CHUNK_OVERLAP_TOKENS}".encode()
+    )
+    return digest.hexdigest()
+
+
+# アシスタントのIDを含めるため、ドキュメントやアシスタントを作り直すと以前の回答は参照されなくなる
+def _answer_cache_key(assistant: Assistant, question: str) -> str:
+    digest: Final = hashlib.sha256(OPENAI_MODEL.encode("utf-8"))
+    for part in (assistant.document_id, assistant.id, normalise_question(question)):
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _summary_cache_key(messages: list[ChatMessage]) -> str:
+    digest: Final = hashlib.sha256(OPENAI_MODEL.encode("utf-8"))
+    for message in messages:
+        digest.update(b"\0" + message.role.encode("utf-8"))
+        digest.update(b"\0" + message.content.encode("utf-8"))
+    return digest.hexdigest()
+
+
 @final
 class _StorageUploadNotificationPayload(BaseModel):
     message: PubSubMessage
@@ -225,7 +449,9 @@ class _StorageUploadNotificationPayload(BaseModel):
 @inject
 async def _storage_upload_notification(
     payload: _StorageUploadNotificationPayload,
-    storage_adapter: StorageAdapter = Depends(Provide[AppContainer.storage_adapter]),
+    download_adapter: DownloadAdapter = Depends(
+        Provide[AppContainer.download_adapter]
+    ),
     document_repository: DocumentRepository = Depends(
         Provide[AppContainer.document_repository]
     ),
@@ -248,12 +474,11 @@ async def _storage_upload_notification(
     else:
         raise AppError(ErrorKind.INTERNAL, "ファイルのURLが不正です")
 
-    destination_file_name: Final = f"/tmp/{uid}_downloaded.csv"
-    await storage_adapter.download_object(params.name, destination_file_name)
-
-    df: Final = pd.read_csv(
-        destination_file_name, header=None, names=["name", "description", "gs_path"]
-    )
+    # 一度しか読み込まないため、キャッシュには載せない
+    async with download_adapter.download(params.name, use_cache=False) as csv:
+        df: Final = pd.read_csv(
+            csv, header=None, names=["name", "description", "gs_path"]
+        )
     documents: list[Document] = [
         Document.new(
             uid, str(row["name"]), str(row["description"]), str(row["gs_path"]), now
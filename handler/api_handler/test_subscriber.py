@@ -0,0 +1,165 @@
+import asyncio
+import io
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, BinaryIO, Optional, cast
+
+import pytest
+
+from adapter.adapter import (
+    AssistantPoolAdapter,
+    AssistantRepository,
+    DocumentRepository,
+    OpenAIAdapter,
+)
+from domain.assistant import Assistant, AssistantId, ThreadId, VectorStoreId
+from domain.document import Document, DocumentId
+from domain.error import AppError, ErrorKind
+from domain.user import UserId
+from handler.api_handler.subscriber import _CreateAssistantPayload, _create_assistant
+
+
+class _Download:
+    @asynccontextmanager
+    async def download(
+        self, key: str, bucket_name: str = "", use_cache: bool = True
+    ) -> AsyncIterator[BinaryIO]:
+        yield io.BytesIO(b"%PDF")
+
+
+class _Documents:
+    def __init__(self, document: Document) -> None:
+        self.document = document
+
+    async def get(self, _id: DocumentId) -> Optional[Document]:
+        return self.document
+
+
+class _Assistants:
+    def __init__(self, fail: bool) -> None:
+        self.fail = fail
+        self.inserted: list[Assistant] = []
+
+    async def get(self, _id: DocumentId) -> Optional[Assistant]:
+        return None
+
+    async def insert_with_update_document(
+        self, assistant: Assistant, document: Document
+    ) -> None:
+        if self.fail:
+            raise AppError(ErrorKind.INTERNAL)
+        self.inserted.append(assistant)
+
+
+class _AssistantsFS:
+    def __init__(self) -> None:
+        self.stored: set[AssistantId] = set()
+
+    async def put(self, assistant: Assistant) -> None:
+        self.stored.add(assistant.id)
+
+    async def delete(self, _id: AssistantId) -> None:
+        self.stored.discard(_id)
+
+
+class _VectorStores:
+    def __init__(self) -> None:
+        self.ref_count = 0
+
+    async def acquire(self, document: BinaryIO) -> VectorStoreId:
+        self.ref_count += 1
+        return VectorStoreId("vs")
+
+    async def release(self, vector_store_id: VectorStoreId) -> None:
+        self.ref_count -= 1
+
+
+class _Pool:
+    def __init__(self, fail: bool) -> None:
+        self.fail = fail
+
+    async def take(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        if self.fail:
+            raise AppError(ErrorKind.INTERNAL)
+        return AssistantId("assistant"), ThreadId("thread")
+
+
+class _TaskQueue:
+    async def send_queue(self, name: str, path: str, payload: dict[str, Any]) -> None:
+        pass
+
+
+class _OpenAI:
+    def __init__(self) -> None:
+        self.deleted: list[AssistantId] = []
+
+    async def delete_assistant(self, assistant_id: AssistantId) -> None:
+        self.deleted.append(assistant_id)
+
+
+def _run(
+    assistants: _Assistants,
+    pool: _Pool,
+    fs: _AssistantsFS,
+    vector_stores: _VectorStores,
+    openai: _OpenAI,
+) -> None:
+    document = Document.new(
+        UserId("user"), "name", "", "gs://bucket/a.pdf", datetime.now(timezone.utc)
+    )
+    asyncio.run(
+        _create_assistant(
+            payload=_CreateAssistantPayload(document_id=document.id),
+            download_adapter=_Download(),
+            # 使うメソッドだけを実装した偽物を渡す
+            assistant_repository=cast(AssistantRepository, assistants),
+            document_repository=cast(DocumentRepository, _Documents(document)),
+            assistant_fs_repository=fs,
+            vector_store_adapter=vector_stores,
+            assistant_pool_adapter=cast(AssistantPoolAdapter, pool),
+            task_queue_adapter=_TaskQueue(),
+            openai_adapter=cast(OpenAIAdapter, openai),
+        )
+    )
+
+
+def test_create_assistant() -> None:
+    assistants = _Assistants(fail=False)
+    fs = _AssistantsFS()
+    vector_stores = _VectorStores()
+    openai = _OpenAI()
+
+    _run(assistants, _Pool(fail=False), fs, vector_stores, openai)
+
+    assert [a.id for a in assistants.inserted] == ["assistant"]
+    assert fs.stored == {"assistant"}
+    assert vector_stores.ref_count == 1
+    assert openai.deleted == []
+
+
+def test_create_assistant_cleans_up_when_insert_fails() -> None:
+    fs = _AssistantsFS()
+    vector_stores = _VectorStores()
+    openai = _OpenAI()
+
+    with pytest.raises(AppError):
+        _run(_Assistants(fail=True), _Pool(fail=False), fs, vector_stores, openai)
+
+    # プールから取り出したアシスタントは削除し、ベクトルストアの参照は戻す
+    assert fs.stored == set()
+    assert vector_stores.ref_count == 0
+    assert openai.deleted == ["assistant"]
+
+
+def test_create_assistant_releases_when_take_fails() -> None:
+    fs = _AssistantsFS()
+    vector_stores = _VectorStores()
+    openai = _OpenAI()
+
+    with pytest.raises(AppError):
+        _run(_Assistants(fail=False), _Pool(fail=True), fs, vector_stores, openai)
+
+    assert vector_stores.ref_count == 0
+    assert openai.deleted == []
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Final, final
+
+from adapter.adapter import (
+    AssistantPoolAdapter,
+    AssistantPoolRepository,
+    MetricsAdapter,
+    OpenAIAdapter,
+)
+from domain.assistant import AssistantId, PooledAssistant, ThreadId, VectorStoreId
+from domain.document import DocumentId
+
+
+# 事前に作っておいたアシスタントとスレッドの組をドキュメントに割り当てる
+# プールが空の場合やサイズが0の場合はその場で作成する
+@final
+class AssistantPoolImpl:
+    def __init__(
+        self,
+        openai: OpenAIAdapter,
+        repository: AssistantPoolRepository,
+        size: int,
+        metrics: MetricsAdapter,
+    ) -> None:
+        self.openai: Final = openai
+        self.repository: Final = repository
+        self.size: Final = size
+        self.metrics: Final = metrics
+
+    @classmethod
+    def new(
+        cls,
+        openai: OpenAIAdapter,
+        repository: AssistantPoolRepository,
+        size: int,
+        metrics: MetricsAdapter,
+    ) -> AssistantPoolAdapter:
+        return cls(openai, repository, size, metrics)
+
+    async def take(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        if self.size > 0:
+            pooled = await self.repository.take()
+            if pooled is not None:
+                self.metrics.incr("assistant_pool_hit")
+                try:
+                    await self.openai.attach_assistant(
+                        pooled.id, document_id, vector_store_id
+                    )
+                except Exception:
+                    # プールから外したアシスタントは他から参照されないため削除する
+                    await self.openai.delete_assistant(pooled.id)
+                    raise
+                return pooled.id, pooled.thread_id
+            self.metrics.incr("assistant_pool_miss")
+
+        return await self.openai.create_assistant(document_id, vector_store_id)
+
+    # 不足している分をまとめて作成し、作成した数を返す
+    async def refill(self) -> int:
+        missing: Final = self.size - await self.repository.count()
+        if missing <= 0:
+            return 0
+
+        started_at: Final = time.perf_counter()
+
+        async def fill() -> None:
+            assistant_id, thread_id = await self.openai.create_pooled_assistant()
+            await self.repository.insert(
+                PooledAssistant.new(
+                    assistant_id, thread_id, datetime.now(timezone.utc)
+                )
+            )
+
+        await asyncio.gather(*(fill() for _ in range(missing)))
+        self.metrics.observe(
+            "assistant_pool_refill_seconds", time.perf_counter() - started_at
+        )
+        return missing
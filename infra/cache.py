@@ -0,0 +1,78 @@
+from typing import Final, final, Optional
+
+from cachetools import Cache, LRUCache, TTLCache
+
+from adapter.adapter import CacheAdapter, MetricsAdapter
+
+
+def _size(value: str) -> int:
+    return len(value.encode("utf-8"))
+
+
+@final
+class LruCacheImpl:
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        metrics: MetricsAdapter,
+        ttl_seconds: float = 0,
+    ) -> None:
+        self.name: Final = name
+        self.metrics: Final = metrics
+        # TTLが0の場合は期限なしで、サイズの上限を超えた分だけ古いものから捨てる
+        self.__cache: Final[Cache[str, str]] = (
+            TTLCache(maxsize=max_bytes, ttl=ttl_seconds, getsizeof=_size)
+            if ttl_seconds > 0
+            else LRUCache(maxsize=max_bytes, getsizeof=_size)
+        )
+
+    @classmethod
+    def new(
+        cls,
+        name: str,
+        max_bytes: int,
+        metrics: MetricsAdapter,
+        ttl_seconds: float = 0,
+    ) -> CacheAdapter:
+        return cls(
+            name=name, max_bytes=max_bytes, metrics=metrics, ttl_seconds=ttl_seconds
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        value: Final[Optional[str]] = self.__cache.get(key)
+        self.metrics.incr(
+            "cache_hit" if value is not None else "cache_miss",
+            labels={"cache": self.name},
+        )
+        return value
+
+    async def put(self, key: str, value: str) -> None:
+        # 上限より大きい値はLRUCacheがValueErrorを送出するため保存しない
+        if _size(value) > self.__cache.maxsize:
+            return
+        self.__cache[key] = value
+
+
+@final
+class TieredCacheImpl:
+    def __init__(self, first: CacheAdapter, second: CacheAdapter) -> None:
+        self.first: Final = first
+        self.second: Final = second
+
+    @classmethod
+    def new(cls, first: CacheAdapter, second: CacheAdapter) -> CacheAdapter:
+        return cls(first=first, second=second)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.first.get(key)
+        if value is not None:
+            return value
+        value = await self.second.get(key)
+        if value is not None:
+            await self.first.put(key, value)
+        return value
+
+    async def put(self, key: str, value: str) -> None:
+        await self.first.put(key, value)
+        await self.second.put(key, value)
@@ -0,0 +1,78 @@
+from typing import Final, Optional, final
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from adapter.adapter import AssistantPoolRepository
+from domain.assistant import PooledAssistant
+from domain.error import AppError, ErrorKind
+from infra.cloud_sql.entity import (
+    PooledAssistantEntity,
+    pooled_assistant_entity_from,
+    pooled_assistant_from,
+)
+
+
+@final
+class AssistantPoolRepoImpl:
+    def __init__(
+        self,
+        session: async_sessionmaker[AsyncSession],
+    ) -> None:
+        self.session: Final = session
+
+    @classmethod
+    def new(
+        cls,
+        session: async_sessionmaker[AsyncSession],
+    ) -> AssistantPoolRepository:
+        return cls(session)
+
+    async def count(self) -> int:
+        try:
+            async with self.session() as session:
+                return (
+                    await session.execute(
+                        select(func.count()).select_from(PooledAssistantEntity)
+                    )
+                ).scalar_one()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    # 同時に取り出しても同じ組を渡さないよう、ロック中の行は読み飛ばす
+    async def take(self) -> Optional[PooledAssistant]:
+        try:
+            async with self.session() as session:
+                oldest = (
+                    select(PooledAssistantEntity.assistant_id)
+                    .order_by(PooledAssistantEntity.created_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                    .scalar_subquery()
+                )
+                entity = (
+                    (
+                        await session.execute(
+                            delete(PooledAssistantEntity)
+                            .where(PooledAssistantEntity.assistant_id == oldest)
+                            .returning(PooledAssistantEntity)
+                        )
+                    )
+                    .scalars()
+                    .one_or_none()
+                )
+                await session.commit()
+                if not entity:
+                    return None
+                return pooled_assistant_from(entity)
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    async def insert(self, pooled: PooledAssistant) -> None:
+        try:
+            async with self.session() as session:
+                entity = pooled_assistant_entity_from(pooled)
+                session.add(entity)
+                await session.commit()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
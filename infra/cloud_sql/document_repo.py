@@ -1,6 +1,6 @@
 from typing import Optional, final, Final
 
-from sqlalchemy import and_, desc
+from sqlalchemy import Delete, and_, delete, desc
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -18,6 +18,7 @@ from infra.cloud_sql.entity import (
     user_from,
     AssistantEntity,
     assistant_from,
+    DocumentSummaryCheckpointEntity,
 )
 
 
@@ -154,6 +155,13 @@ class DocumentRepoImpl:
         except Exception as e:
             raise AppError(ErrorKind.INTERNAL) from e
 
+    # 外部キーにON DELETE CASCADEを付ける前に作ったテーブルでも消えるよう、明示的に削除する
+    @staticmethod
+    def __delete_checkpoints(_id: DocumentId) -> Delete:
+        return delete(DocumentSummaryCheckpointEntity).where(
+            DocumentSummaryCheckpointEntity.document_id == _id
+        )
+
     async def delete(self, _id: DocumentId) -> None:
         try:
             async with self.session() as session:
@@ -164,6 +172,7 @@ class DocumentRepoImpl:
                 )
                 if not entity:
                     raise AppError(ErrorKind.NOT_FOUND)
+                await session.execute(self.__delete_checkpoints(_id))
                 await session.delete(entity)
                 await session.commit()
         except Exception as e:
@@ -192,6 +201,7 @@ class DocumentRepoImpl:
                 )
                 if not document_entity:
                     raise AppError(ErrorKind.NOT_FOUND)
+                await session.execute(self.__delete_checkpoints(_id))
                 await session.delete(document_entity)
 
                 await session.commit()
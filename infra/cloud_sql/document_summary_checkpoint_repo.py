@@ -0,0 +1,82 @@
+from typing import Optional, final, Final
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+from adapter.adapter import DocumentSummaryCheckpointRepository
+from domain.document import DocumentId, DocumentSummaryCheckpoint
+from domain.error import ErrorKind, AppError
+from infra.cloud_sql.entity import (
+    DocumentSummaryCheckpointEntity,
+    document_summary_checkpoint_from,
+)
+
+
+@final
+class DocumentSummaryCheckpointRepoImpl:
+    def __init__(
+        self,
+        session: async_sessionmaker[AsyncSession],
+    ) -> None:
+        self.session: Final = session
+
+    @classmethod
+    def new(
+        cls,
+        session: async_sessionmaker[AsyncSession],
+    ) -> DocumentSummaryCheckpointRepository:
+        return cls(session)
+
+    async def find_by_document(
+        self, document_id: DocumentId, source_hash: str
+    ) -> list[DocumentSummaryCheckpoint]:
+        try:
+            async with self.session() as session:
+                entities = (
+                    (
+                        await session.execute(
+                            select(DocumentSummaryCheckpointEntity)
+                            .filter_by(document_id=document_id, source_hash=source_hash)
+                            .order_by(DocumentSummaryCheckpointEntity.index)
+                        )
+                    )
+                    .scalars()
+                    .all()
+                )
+                return [document_summary_checkpoint_from(e) for e in entities]
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    async def insert(self, checkpoint: DocumentSummaryCheckpoint) -> None:
+        try:
+            async with self.session() as session:
+                stmt = insert(DocumentSummaryCheckpointEntity).values(
+                    document_id=checkpoint.document_id,
+                    source_hash=checkpoint.source_hash,
+                    index=checkpoint.index,
+                    text=checkpoint.text,
+                    created_at=checkpoint.created_at,
+                )
+                await session.execute(stmt.on_conflict_do_nothing())
+                await session.commit()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    async def delete_by_document(
+        self, document_id: DocumentId, keep_source_hash: Optional[str] = None
+    ) -> None:
+        try:
+            async with self.session() as session:
+                stmt = delete(DocumentSummaryCheckpointEntity).where(
+                    DocumentSummaryCheckpointEntity.document_id == document_id
+                )
+                if keep_source_hash is not None:
+                    stmt = stmt.where(
+                        DocumentSummaryCheckpointEntity.source_hash != keep_source_hash
+                    )
+                await session.execute(stmt)
+                await session.commit()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
@@ -1,6 +1,6 @@
 from typing import final, Final
 
-from sqlalchemy import delete
+from sqlalchemy import delete, func
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
 
@@ -35,8 +35,11 @@ class DocumentSummaryRepoImpl:
                 entities = (
                     (
                         await session.execute(
-                            select(DocumentSummaryEntity).filter_by(
-                                document_id=document_id
+                            select(DocumentSummaryEntity)
+                            .filter_by(document_id=document_id)
+                            .order_by(
+                                DocumentSummaryEntity.level,
+                                DocumentSummaryEntity.index,
                             )
                         )
                     )
@@ -47,6 +50,32 @@ class DocumentSummaryRepoImpl:
         except Exception as e:
             raise AppError(ErrorKind.INTERNAL) from e
 
+    async def find_top_by_document(
+        self, document_id: DocumentId
+    ) -> list[DocumentSummary]:
+        try:
+            async with self.session() as session:
+                top_level = (
+                    select(func.max(DocumentSummaryEntity.level))
+                    .filter_by(document_id=document_id)
+                    .scalar_subquery()
+                )
+                entities = (
+                    (
+                        await session.execute(
+                            select(DocumentSummaryEntity)
+                            .filter_by(document_id=document_id)
+                            .where(DocumentSummaryEntity.level == top_level)
+                            .order_by(DocumentSummaryEntity.index)
+                        )
+                    )
+                    .scalars()
+                    .all()
+                )
+                return [document_summary_from(e) for e in entities]
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
     async def insert(self, summary: DocumentSummary) -> None:
         try:
             async with self.session() as session:
@@ -56,6 +85,22 @@ class DocumentSummaryRepoImpl:
         except Exception as e:
             raise AppError(ErrorKind.INTERNAL) from e
 
+    async def replace_for_document(
+        self, document_id: DocumentId, summaries: list[DocumentSummary]
+    ) -> None:
+        # 削除と挿入を1つのトランザクションで行い、読み込み側に書き込み途中の状態を見せない
+        try:
+            async with self.session() as session:
+                stmt = delete(DocumentSummaryEntity).where(
+                    DocumentSummaryEntity.document_id == document_id
+                )
+                await session.execute(stmt)
+                # flush時に複数行のINSERTにまとめられる
+                session.add_all([document_summary_entity_from(s) for s in summaries])
+                await session.commit()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
     async def delete_by_document(self, document_id: DocumentId) -> None:
         try:
             async with self.session() as session:
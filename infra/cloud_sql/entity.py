@@ -1,19 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import final
+from typing import final, Optional
 
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Mapped
 
-from domain.assistant import Assistant, ThreadId, AssistantId
+from domain.assistant import (
+    Assistant,
+    ThreadId,
+    AssistantId,
+    PooledAssistant,
+    VectorStore,
+    VectorStoreId,
+)
 from domain.document import (
     Document,
     DocumentId,
     Status,
     DocumentSummary,
     DocumentSummaryId,
+    DocumentSummaryCheckpoint,
+    SummaryRunId,
 )
 from domain.user import User, UserId
 
@@ -119,6 +128,8 @@ class DocumentSummaryEntity(Base):
     document_id: str = Column(String(255), ForeignKey("documents.id"), nullable=False)
     text: str = Column(Text, nullable=False)
     index: int = Column(Integer(), nullable=False)
+    level: int = Column(Integer(), nullable=False)
+    run_id: str = Column(String(255), nullable=False)
     created_at: datetime = Column(DateTime(timezone=True), nullable=False)
     updated_at: datetime = Column(DateTime(timezone=True), nullable=False)
 
@@ -133,6 +144,8 @@ def document_summary_entity_from(d: DocumentSummary) -> DocumentSummaryEntity:
         document_id=d.document_id,
         text=d.text,
         index=d.index,
+        level=d.level,
+        run_id=d.run_id,
         created_at=d.created_at,
         updated_at=d.updated_at,
     )
@@ -144,11 +157,38 @@ def document_summary_from(e: DocumentSummaryEntity) -> DocumentSummary:
         document_id=DocumentId(e.document_id),
         text=e.text,
         index=e.index,
+        level=e.level,
+        run_id=SummaryRunId(e.run_id),
         created_at=e.created_at,
         updated_at=e.updated_at,
     )
 
 
+@final
+class DocumentSummaryCheckpointEntity(Base):
+    __tablename__ = "document_summary_checkpoints"
+
+    document_id: str = Column(
+        String(255), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+    )
+    source_hash: str = Column(String(64), primary_key=True)
+    index: int = Column(Integer(), primary_key=True)
+    text: str = Column(Text, nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False)
+
+
+def document_summary_checkpoint_from(
+    e: DocumentSummaryCheckpointEntity,
+) -> DocumentSummaryCheckpoint:
+    return DocumentSummaryCheckpoint(
+        document_id=DocumentId(e.document_id),
+        source_hash=e.source_hash,
+        index=e.index,
+        text=e.text,
+        created_at=e.created_at,
+    )
+
+
 @final
 class AssistantEntity(Base):
     __tablename__ = "assistants"
@@ -156,6 +196,10 @@ class AssistantEntity(Base):
     document_id: str = Column(String(255), ForeignKey("documents.id"), primary_key=True)
     assistant_id: str = Column(String(255), nullable=False)
     thread_id: str = Column(String(255), nullable=False)
+    # mypyプラグインがnullableな列をOptionalとして解決できないため無視する
+    vector_store_id: Optional[str] = Column(  # type: ignore[misc]
+        String(255), nullable=True
+    )
     used_at: datetime = Column(DateTime(timezone=True), nullable=False)
     created_at: datetime = Column(DateTime(timezone=True), nullable=False)
     updated_at: datetime = Column(DateTime(timezone=True), nullable=False)
@@ -174,6 +218,7 @@ def assistant_entity_from(d: Assistant) -> AssistantEntity:
         document_id=d.document_id,
         assistant_id=d.id,
         thread_id=d.thread_id,
+        vector_store_id=d.vector_store_id,
         used_at=d.used_at,
         created_at=d.created_at,
         updated_at=d.updated_at,
@@ -188,4 +233,73 @@ def assistant_from(e: AssistantEntity) -> Assistant:
         used_at=e.used_at,
         created_at=e.created_at,
         updated_at=e.updated_at,
+        vector_store_id=(
+            VectorStoreId(e.vector_store_id) if e.vector_store_id else None
+        ),
+    )
+
+
+@final
+class PooledAssistantEntity(Base):
+    __tablename__ = "assistant_pool"
+
+    assistant_id: str = Column(String(255), primary_key=True)
+    thread_id: str = Column(String(255), nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False)
+
+
+def pooled_assistant_entity_from(d: PooledAssistant) -> PooledAssistantEntity:
+    return PooledAssistantEntity(
+        assistant_id=d.id,
+        thread_id=d.thread_id,
+        created_at=d.created_at,
     )
+
+
+def pooled_assistant_from(e: PooledAssistantEntity) -> PooledAssistant:
+    return PooledAssistant(
+        id=AssistantId(e.assistant_id),
+        thread_id=ThreadId(e.thread_id),
+        created_at=e.created_at,
+    )
+
+
+@final
+class VectorStoreEntity(Base):
+    __tablename__ = "vector_stores"
+
+    id: str = Column(String(255), primary_key=True)
+    content_hash: str = Column(String(64), nullable=False, unique=True)
+    ref_count: int = Column(Integer(), nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False)
+    updated_at: datetime = Column(DateTime(timezone=True), nullable=False)
+
+
+def vector_store_entity_from(d: VectorStore) -> VectorStoreEntity:
+    return VectorStoreEntity(
+        id=d.id,
+        content_hash=d.content_hash,
+        ref_count=d.ref_count,
+        created_at=d.created_at,
+        updated_at=d.updated_at,
+    )
+
+
+@final
+class SummaryCacheEntity(Base):
+    __tablename__ = "summary_caches"
+
+    key: str = Column(String(64), primary_key=True)
+    value: str = Column(Text, nullable=False)
+    size: int = Column(Integer(), nullable=False)
+    used_at: datetime = Column(DateTime(timezone=True), nullable=False)
+
+
+@final
+class RateLimitEntity(Base):
+    __tablename__ = "rate_limits"
+
+    name: str = Column(String(64), primary_key=True)
+    # mypyプラグインがジェネリックな型(Float[_N])を解決できないため無視する
+    tokens: float = Column(Float(), nullable=False)  # type: ignore[misc]
+    updated_at: datetime = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Final, final
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from adapter.adapter import MetricsAdapter, RateLimiterAdapter
+from domain.error import AppError, ErrorKind
+from infra.cloud_sql.entity import RateLimitEntity
+
+
+# 複数のインスタンスで1つの予算を共有するため、バケットの残量をCloud SQLに持つ
+# 補充と予約を1つのUPSERTで行い、行ロックの順に予約が積み上がる
+# 経過時間はDBの時刻で計算するため、インスタンス間の時計のずれの影響を受けない
+# now()はトランザクションの開始時刻で、行ロックを待った間に後から始まったトランザクションが
+# より新しい時刻を書き込んでいることがあるため、clock_timestamp()を使い時刻が戻らないようにする
+@final
+class RateLimiterRepoImpl:
+    def __init__(
+        self,
+        session: async_sessionmaker[AsyncSession],
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        metrics: MetricsAdapter,
+    ) -> None:
+        self.session: Final = session
+        self.name: Final = name
+        self.requests_per_minute: Final = requests_per_minute
+        self.tokens_per_minute: Final = tokens_per_minute
+        self.metrics: Final = metrics
+
+    @classmethod
+    def new(
+        cls,
+        session: async_sessionmaker[AsyncSession],
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        metrics: MetricsAdapter,
+    ) -> RateLimiterAdapter:
+        return cls(session, name, requests_per_minute, tokens_per_minute, metrics)
+
+    async def acquire(self, requests: int, tokens: int) -> None:
+        try:
+            async with self.session() as session:
+                wait = 0.0
+                for suffix, capacity, amount in (
+                    ("requests", self.requests_per_minute, requests),
+                    ("tokens", self.tokens_per_minute, tokens),
+                ):
+                    per_second = capacity / 60
+                    elapsed = func.greatest(
+                        0,
+                        func.extract(
+                            "epoch", func.clock_timestamp() - RateLimitEntity.updated_at
+                        ),
+                    )
+                    stmt = insert(RateLimitEntity).values(
+                        name=f"{self.name}:{suffix}",
+                        tokens=capacity - amount,
+                        updated_at=func.clock_timestamp(),
+                    )
+                    remaining = (
+                        await session.execute(
+                            stmt.on_conflict_do_update(
+                                index_elements=[RateLimitEntity.name],
+                                set_={
+                                    "tokens": func.least(
+                                        capacity,
+                                        RateLimitEntity.tokens + elapsed * per_second,
+                                    )
+                                    - amount,
+                                    "updated_at": func.greatest(
+                                        RateLimitEntity.updated_at,
+                                        func.clock_timestamp(),
+                                    ),
+                                },
+                            ).returning(RateLimitEntity.tokens)
+                        )
+                    ).scalar_one()
+                    wait = max(wait, -remaining / per_second)
+                await session.commit()
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+        self.metrics.observe("openai_rate_limit_wait_seconds", wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, final, Final
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+from adapter.adapter import CacheAdapter, LogAdapter, MetricsAdapter
+from infra.cloud_sql.entity import SummaryCacheEntity
+
+# 使われた時刻は削除の順番にしか使わないため、この間隔より古い場合にだけ更新する
+_TOUCH_INTERVAL: Final = timedelta(hours=1)
+# 上限のこの割合だけ書き込むたびに、同じ割合だけ空くまでまとめて削除する
+_EVICTION_BATCH_RATIO: Final = 0.1
+
+
+# キャッシュがなくても要約はできるため、DBのエラーはログに残して読み書きしなかったものとして扱う
+@final
+class SummaryCacheRepoImpl:
+    def __init__(
+        self,
+        session: async_sessionmaker[AsyncSession],
+        max_bytes: int,
+        metrics: MetricsAdapter,
+        log: LogAdapter,
+    ) -> None:
+        self.session: Final = session
+        self.max_bytes: Final = max_bytes
+        self.metrics: Final = metrics
+        self.log: Final = log
+        self.__eviction_batch_bytes: Final = int(max_bytes * _EVICTION_BATCH_RATIO)
+        # インスタンスごとに数えるため、全体ではインスタンス数の分だけ上限を超えることがある
+        self.__written_bytes: int = 0
+
+    @classmethod
+    def new(
+        cls,
+        session: async_sessionmaker[AsyncSession],
+        max_bytes: int,
+        metrics: MetricsAdapter,
+        log: LogAdapter,
+    ) -> CacheAdapter:
+        return cls(session, max_bytes, metrics, log)
+
+    def __failed(self, e: Exception) -> None:
+        self.metrics.incr("cache_error", labels={"cache": "summary_cloud_sql"})
+        self.log.log_error(e)
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            async with self.session() as session:
+                entity = (
+                    (
+                        await session.execute(
+                            select(SummaryCacheEntity).filter_by(key=key)
+                        )
+                    )
+                    .scalars()
+                    .one_or_none()
+                )
+                self.metrics.incr(
+                    "cache_hit" if entity else "cache_miss",
+                    labels={"cache": "summary_cloud_sql"},
+                )
+                if not entity:
+                    return None
+                value: Final = entity.value
+                now: Final = datetime.now(timezone.utc)
+                if now - entity.used_at >= _TOUCH_INTERVAL:
+                    await session.execute(
+                        update(SummaryCacheEntity)
+                        .where(SummaryCacheEntity.key == key)
+                        .values(used_at=now)
+                    )
+                    await session.commit()
+                return value
+        except Exception as e:
+            self.__failed(e)
+            return None
+
+    async def put(self, key: str, value: str) -> None:
+        now: Final = datetime.now(timezone.utc)
+        size: Final = len(value.encode("utf-8"))
+        try:
+            async with self.session() as session:
+                stmt = insert(SummaryCacheEntity).values(
+                    key=key, value=value, size=size, used_at=now
+                )
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[SummaryCacheEntity.key],
+                        set_={"value": value, "size": size, "used_at": now},
+                    )
+                )
+                await session.commit()
+
+            self.__written_bytes += size
+            if self.__written_bytes >= self.__eviction_batch_bytes:
+                self.__written_bytes = 0
+                await self.__evict()
+        except Exception as e:
+            self.__failed(e)
+
+    # 新しいものから累積したサイズが、上限から1回分の書き込み量を
+    # 引いた値を超えた古いエントリを削除する
+    async def __evict(self) -> None:
+        async with self.session() as session:
+            cumulative = (
+                select(
+                    SummaryCacheEntity.key,
+                    func.sum(SummaryCacheEntity.size)
+                    .over(
+                        order_by=(
+                            SummaryCacheEntity.used_at.desc(),
+                            SummaryCacheEntity.key,
+                        )
+                    )
+                    .label("total"),
+                )
+            ).subquery()
+            await session.execute(
+                delete(SummaryCacheEntity).where(
+                    SummaryCacheEntity.key.in_(
+                        select(cumulative.c.key).where(
+                            cumulative.c.total
+                            > self.max_bytes - self.__eviction_batch_bytes
+                        )
+                    )
+                )
+            )
+            await session.commit()
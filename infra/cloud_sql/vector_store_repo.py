@@ -0,0 +1,98 @@
+from typing import Final, Optional, final
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from adapter.adapter import VectorStoreRepository
+from domain.assistant import VectorStore, VectorStoreId
+from domain.error import AppError, ErrorKind
+from infra.cloud_sql.entity import VectorStoreEntity, vector_store_entity_from
+
+
+# 参照数の増減は1文のUPDATE/DELETEで行い、同じ行への操作は行ロックで直列化される
+@final
+class VectorStoreRepoImpl:
+    def __init__(
+        self,
+        session: async_sessionmaker[AsyncSession],
+    ) -> None:
+        self.session: Final = session
+
+    @classmethod
+    def new(
+        cls,
+        session: async_sessionmaker[AsyncSession],
+    ) -> VectorStoreRepository:
+        return cls(session)
+
+    async def acquire(self, content_hash: str) -> Optional[VectorStoreId]:
+        try:
+            async with self.session() as session:
+                _id = (
+                    await session.execute(
+                        update(VectorStoreEntity)
+                        .where(VectorStoreEntity.content_hash == content_hash)
+                        .values(
+                            ref_count=VectorStoreEntity.ref_count + 1,
+                            updated_at=func.now(),
+                        )
+                        .returning(VectorStoreEntity.id)
+                    )
+                ).scalar_one_or_none()
+                await session.commit()
+                return VectorStoreId(_id) if _id else None
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    async def insert(self, vector_store: VectorStore) -> bool:
+        try:
+            async with self.session() as session:
+                entity = vector_store_entity_from(vector_store)
+                inserted = (
+                    await session.execute(
+                        insert(VectorStoreEntity)
+                        .values(
+                            id=entity.id,
+                            content_hash=entity.content_hash,
+                            ref_count=entity.ref_count,
+                            created_at=entity.created_at,
+                            updated_at=entity.updated_at,
+                        )
+                        .on_conflict_do_nothing(
+                            index_elements=[VectorStoreEntity.content_hash]
+                        )
+                        .returning(VectorStoreEntity.id)
+                    )
+                ).scalar_one_or_none()
+                await session.commit()
+                return inserted is not None
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
+
+    async def release(self, _id: VectorStoreId) -> bool:
+        try:
+            async with self.session() as session:
+                deleted = (
+                    await session.execute(
+                        delete(VectorStoreEntity)
+                        .where(
+                            VectorStoreEntity.id == _id,
+                            VectorStoreEntity.ref_count <= 1,
+                        )
+                        .returning(VectorStoreEntity.id)
+                    )
+                ).scalar_one_or_none()
+                if deleted is None:
+                    await session.execute(
+                        update(VectorStoreEntity)
+                        .where(VectorStoreEntity.id == _id)
+                        .values(
+                            ref_count=VectorStoreEntity.ref_count - 1,
+                            updated_at=func.now(),
+                        )
+                    )
+                await session.commit()
+                return deleted is not None
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL) from e
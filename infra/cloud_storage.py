@@ -1,16 +1,29 @@
 import asyncio
+import base64
+import hashlib
+import io
 import os
+import shutil
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import timedelta
-from typing import Final, final
+from typing import Any, AsyncIterator, BinaryIO, Callable, Final, Optional, final
 
 import google.auth
+import google.auth.credentials
+import google_crc32c
+from cachetools import LRUCache
 from google.auth.transport import requests
 from google.cloud.storage import Client, Bucket, Blob
 from google.oauth2.service_account import Credentials
 
-from adapter.adapter import StorageAdapter
+from adapter.adapter import DownloadAdapter, MetricsAdapter, StorageAdapter
 from config.envs import DEFAULT_BUCKET_NAME
 from domain.error import AppError, ErrorKind
+from domain.transfer import byte_ranges
 
 
 def _local_credentials() -> Credentials:
@@ -24,12 +37,36 @@ def _local_credentials() -> Credentials:
     return credentials
 
 
-def _credential() -> Credentials:
-    # https://stackoverflow.com/questions/64234214/how-to-generate-a-blob-signed-url-in-google-cloud-run
-    credentials, _ = google.auth.default()  # type: ignore
-    credentials.refresh(requests.Request())  # type: ignore
-    cred: Final[Credentials] = credentials
-    return cred
+# 署名に使う認証情報をメモリ上に保持し、トークンの期限が近づいた場合だけ更新する
+# 同時に呼ばれた場合も更新は1回だけ行い、他の呼び出しはその結果を待つ
+@final
+class _Signer:
+    def __init__(self) -> None:
+        self.is_local: Final = os.getenv("IS_LOCAL", "") == "true"
+        self.__lock: Final = threading.Lock()
+        self.__request: Final = requests.Request()
+        self.__local_credentials: Optional[Credentials] = None
+        self.__credentials: Optional[google.auth.credentials.Credentials] = None
+
+    def signing_args(self) -> dict[str, Any]:
+        with self.__lock:
+            if self.is_local:
+                if self.__local_credentials is None:
+                    self.__local_credentials = _local_credentials()
+                return {"credentials": self.__local_credentials}
+
+            # https://stackoverflow.com/questions/64234214/how-to-generate-a-blob-signed-url-in-google-cloud-run
+            if self.__credentials is None:
+                self.__credentials, _ = google.auth.default()
+            # 期限の少し前(google-authのREFRESH_THRESHOLD)から無効とみなされる
+            if not self.__credentials.valid:
+                self.__credentials.refresh(self.__request)  # type: ignore
+            return {
+                "access_token": self.__credentials.token,
+                "service_account_email": getattr(
+                    self.__credentials, "service_account_email"
+                ),
+            }
 
 
 @final
@@ -37,18 +74,50 @@ class CloudStorageImpl:
     def __init__(
         self,
         cli: Client,
+        in_memory_max_bytes: int,
+        slice_bytes: int,
+        parallelism: int,
     ) -> None:
         self.cli: Final[Client] = cli
+        self.in_memory_max_bytes: Final = in_memory_max_bytes
+        self.slice_bytes: Final = slice_bytes
+        self.parallelism: Final = parallelism
+        self.__signer: Final = _Signer()
 
     def download_object(
         self,
         key: str,
         destination_file_name: str,
         bucket_name: str = DEFAULT_BUCKET_NAME,
+    ) -> None:
+        bucket: Final[Bucket] = self.cli.bucket(bucket_name)
+        if self.parallelism <= 1:
+            bucket.blob(key).download_to_filename(destination_file_name)
+            return
+
+        blob: Final[Optional[Blob]] = bucket.get_blob(key)
+        if blob is None:
+            raise AppError(ErrorKind.NOT_FOUND, f"指定されたキーが存在しません: {key}")
+        if not self.__sliced(blob):
+            blob.download_to_filename(destination_file_name)
+            return
+        with open(destination_file_name, "w+b") as f:
+            os.ftruncate(f.fileno(), blob.size or 0)
+            fd: Final = f.fileno()
+            self.__download_slices(
+                blob, lambda offset, data: _pwrite_all(fd, data, offset)
+            )
+            _verify_crc32c(blob, f)
+
+    def upload_object(
+        self,
+        key: str,
+        source_file_name: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
     ) -> None:
         bucket: Final[Bucket] = self.cli.bucket(bucket_name)
         blob: Final[Blob] = bucket.blob(key)
-        blob.download_to_filename(destination_file_name)
+        blob.upload_from_filename(source_file_name)
 
     def gen_pre_signed_upload_url(
         self,
@@ -59,26 +128,13 @@ class CloudStorageImpl:
     ) -> str:
         bucket: Final[Bucket] = self.cli.bucket(bucket_name)
         blob: Final[Blob] = bucket.blob(key)
-
-        if os.getenv("IS_LOCAL", "") == "true":
-            url: str = blob.generate_signed_url(
-                credentials=_local_credentials(),
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="PUT",
-                content_type=content_type,
-            )
-        else:
-            credentials = _credential()
-            url = blob.generate_signed_url(
-                access_token=credentials.token,
-                service_account_email=credentials.service_account_email,
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="PUT",
-                content_type=content_type,
-            )
-
+        url: Final[str] = blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(minutes=expiration_minutes),
+            method="PUT",
+            content_type=content_type,
+            **self.__signer.signing_args(),
+        )
         return url
 
     def gen_pre_signed_get_url(
@@ -89,23 +145,12 @@ class CloudStorageImpl:
     ) -> str:
         bucket: Final[Bucket] = self.cli.bucket(bucket_name)
         blob: Final[Blob] = bucket.blob(key)
-        if os.getenv("IS_LOCAL", "") == "true":
-            url: str = blob.generate_signed_url(
-                credentials=_local_credentials(),
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="GET",
-            )
-        else:
-            credentials = _credential()
-            url = blob.generate_signed_url(
-                access_token=credentials.token,
-                service_account_email=credentials.service_account_email,
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="GET",
-            )
-
+        url: Final[str] = blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(minutes=expiration_minutes),
+            method="GET",
+            **self.__signer.signing_args(),
+        )
         return url
 
     def delete_object(self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME) -> None:
@@ -117,6 +162,81 @@ class CloudStorageImpl:
         else:
             raise AppError(ErrorKind.NOT_FOUND, f"指定されたキーが存在しません: {key}")
 
+    def get_generation(self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME) -> int:
+        bucket: Final[Bucket] = self.cli.bucket(bucket_name)
+        blob: Final[Optional[Blob]] = bucket.get_blob(key)
+        if blob is None or blob.generation is None:
+            raise AppError(ErrorKind.NOT_FOUND, f"指定されたキーが存在しません: {key}")
+        generation: Final[int] = blob.generation
+        return generation
+
+    # 上限以下のオブジェクトはメモリ上に、それより大きいものは名前のない一時ファイルに読み込む
+    # 取得したメタデータの世代を指定してダウンロードするため、途中で更新されても内容は混ざらない
+    def open_object(self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME) -> BinaryIO:
+        bucket: Final[Bucket] = self.cli.bucket(bucket_name)
+        blob: Final[Optional[Blob]] = bucket.get_blob(key)
+        if blob is None:
+            raise AppError(ErrorKind.NOT_FOUND, f"指定されたキーが存在しません: {key}")
+        size: Final = blob.size or 0
+        buffer: Final[BinaryIO] = (
+            io.BytesIO()
+            if size <= self.in_memory_max_bytes
+            else tempfile.TemporaryFile()
+        )
+        try:
+            if not self.__sliced(blob):
+                blob.download_to_file(buffer)
+            elif isinstance(buffer, io.BytesIO):
+                # 末尾に書き込んで全体の領域を確保してから、各範囲をその位置に書き込む
+                buffer.seek(size - 1)
+                buffer.write(b"\0")
+                with buffer.getbuffer() as view:
+
+                    def write(offset: int, data: bytes) -> None:
+                        view[offset : offset + len(data)] = data
+
+                    self.__download_slices(blob, write)
+                _verify_crc32c(blob, buffer)
+            else:
+                os.ftruncate(buffer.fileno(), size)
+                fd: Final = buffer.fileno()
+                self.__download_slices(
+                    blob, lambda offset, data: _pwrite_all(fd, data, offset)
+                )
+                _verify_crc32c(blob, buffer)
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer
+
+    def __sliced(self, blob: Blob) -> bool:
+        return self.parallelism > 1 and (blob.size or 0) > self.slice_bytes
+
+    # 1本のストリームでは帯域を使い切れないため、大きいオブジェクトは範囲ごとに並列で取得する
+    # 取得中に更新されても内容が混ざらないよう、すべての範囲で同じ世代を指定する
+    def __download_slices(
+        self, blob: Blob, write: Callable[[int, bytes], None]
+    ) -> None:
+        def fetch(_range: tuple[int, int]) -> None:
+            start, end = _range
+            data = blob.bucket.blob(
+                blob.name, generation=blob.generation
+            ).download_as_bytes(start=start, end=end - 1, checksum=None)
+            if len(data) != end - start:
+                raise AppError(
+                    ErrorKind.INTERNAL,
+                    f"取得したサイズが一致しません: {blob.name} {start}-{end}",
+                )
+            write(start, data)
+
+        ranges: Final = byte_ranges(blob.size or 0, self.slice_bytes)
+        with ThreadPoolExecutor(
+            max_workers=min(self.parallelism, len(ranges))
+        ) as executor:
+            for _ in executor.map(fetch, ranges):
+                pass
+
 
 @final
 class AsyncCloudStorageImpl:
@@ -143,6 +263,19 @@ class AsyncCloudStorageImpl:
             bucket_name=bucket_name,
         )
 
+    async def upload_object(
+        self,
+        key: str,
+        source_file_name: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+    ) -> None:
+        await asyncio.to_thread(
+            self.inner.upload_object,
+            key=key,
+            source_file_name=source_file_name,
+            bucket_name=bucket_name,
+        )
+
     async def gen_pre_signed_upload_url(
         self,
         key: str,
@@ -179,3 +312,152 @@ class AsyncCloudStorageImpl:
         await asyncio.to_thread(
             self.inner.delete_object, key=key, bucket_name=bucket_name
         )
+
+    async def get_generation(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> int:
+        generation: int = await asyncio.to_thread(
+            self.inner.get_generation, key=key, bucket_name=bucket_name
+        )
+        return generation
+
+    async def open_object(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> BinaryIO:
+        opened: BinaryIO = await asyncio.to_thread(
+            self.inner.open_object, key=key, bucket_name=bucket_name
+        )
+        return opened
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view: Final = memoryview(data)
+    written = 0
+    while written < len(view):
+        written += os.pwrite(fd, view[written:], offset + written)
+
+
+# 範囲ごとの取得ではチェックサムを検証できないため、全体を書き込んだ後にまとめて検証する
+def _verify_crc32c(blob: Blob, buffer: BinaryIO) -> None:
+    if blob.crc32c is None:
+        return
+    checksum: Final = google_crc32c.Checksum()  # type: ignore[no-untyped-call]
+    buffer.seek(0)
+    for chunk in iter(lambda: buffer.read(1024 * 1024), b""):
+        checksum.update(chunk)  # type: ignore[no-untyped-call]
+    digest: Final[bytes] = checksum.digest()  # type: ignore[no-untyped-call]
+    if base64.b64encode(digest).decode("ascii") != blob.crc32c:
+        raise AppError(
+            ErrorKind.INTERNAL, f"ダウンロードしたファイルが破損しています: {blob.name}"
+        )
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _open(path: str) -> BinaryIO:
+    return open(path, "rb")
+
+
+def _entry_size(entry: tuple[str, int]) -> int:
+    return entry[1]
+
+
+# ダウンロードしたオブジェクトを開いた状態で渡し、使い終わったら閉じる
+# 各ジョブは自分で開いたファイルかバッファを読むため、他のジョブと内容が混ざることはない
+# オブジェクトの世代ごとにキャッシュするため、更新されたファイルは再度ダウンロードされる
+@final
+class CloudStorageDownloadImpl:
+    def __init__(
+        self,
+        storage: StorageAdapter,
+        work_dir: str,
+        cache_bytes: int,
+        metrics: MetricsAdapter,
+    ) -> None:
+        self.storage: Final = storage
+        self.metrics: Final = metrics
+        self.__cache_dir: Final = os.path.join(work_dir, "cache")
+        self.__cache: Final[LRUCache[str, tuple[str, int]]] = LRUCache(
+            maxsize=cache_bytes, getsizeof=_entry_size
+        )
+        self.__locks: Final[weakref.WeakValueDictionary[str, asyncio.Lock]] = (
+            weakref.WeakValueDictionary()
+        )
+        # 以前のプロセスが残したファイルはキャッシュの管理外のため削除しておく
+        shutil.rmtree(self.__cache_dir, ignore_errors=True)
+        os.makedirs(self.__cache_dir, exist_ok=True)
+
+    @classmethod
+    def new(
+        cls,
+        storage: StorageAdapter,
+        work_dir: str,
+        cache_bytes: int,
+        metrics: MetricsAdapter,
+    ) -> DownloadAdapter:
+        return cls(storage, work_dir, cache_bytes, metrics)
+
+    @asynccontextmanager
+    async def download(
+        self,
+        key: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+        use_cache: bool = True,
+    ) -> AsyncIterator[BinaryIO]:
+        opened: Final = (
+            await self.__open_cached(key, bucket_name)
+            if use_cache and self.__cache.maxsize > 0
+            else await self.storage.open_object(key, bucket_name)
+        )
+        try:
+            yield opened
+        finally:
+            opened.close()
+
+    async def __open_cached(self, key: str, bucket_name: str) -> BinaryIO:
+        generation: Final = await self.storage.get_generation(key, bucket_name)
+        cache_key: Final = f"{bucket_name}/{key}#{generation}"
+        lock: Final = self.__locks.setdefault(cache_key, asyncio.Lock())
+
+        # 同じオブジェクトを同時に要求された場合は、最初のダウンロードを待ってキャッシュから返す
+        async with lock:
+            cached: Final[Optional[tuple[str, int]]] = self.__cache.get(cache_key)
+            if cached is not None:
+                try:
+                    opened = await asyncio.to_thread(_open, cached[0])
+                    self.metrics.incr("cache_hit", labels={"cache": "download"})
+                    return opened
+                except FileNotFoundError:
+                    self.__cache.pop(cache_key, None)
+            self.metrics.incr("cache_miss", labels={"cache": "download"})
+
+            cache_path: Final = os.path.join(
+                self.__cache_dir, hashlib.sha256(cache_key.encode("utf-8")).hexdigest()
+            )
+            download_path: Final = f"{cache_path}.download"
+            try:
+                await self.storage.download_object(key, download_path, bucket_name)
+                opened = await asyncio.to_thread(_open, download_path)
+            except BaseException:
+                await asyncio.to_thread(_remove, download_path)
+                raise
+            # 開いているファイルは削除しても読めるため、キャッシュに載らない大きさなら名前だけ消す
+            size: Final = os.fstat(opened.fileno()).st_size
+            if size > self.__cache.maxsize:
+                await asyncio.to_thread(_remove, download_path)
+                return opened
+
+            # 容量の上限を超える分は古いものから追い出してファイルも削除する
+            # 使用中のジョブはファイルを開いたままのため、削除しても読み込みは続けられる
+            # 他のジョブと追い出しが重ならないよう、ここから登録までの間はawaitしない
+            os.replace(download_path, cache_path)
+            while self.__cache.currsize + size > self.__cache.maxsize:
+                _, (evicted_path, _) = self.__cache.popitem()
+                _remove(evicted_path)
+            self.__cache[cache_key] = (cache_path, size)
+            return opened
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+import weakref
+from contextlib import aclosing
+from typing import AsyncGenerator, BinaryIO, Final, Optional, final
+
+from cachetools import LRUCache
+
+from adapter.adapter import (
+    ChatMessage,
+    MetricsAdapter,
+    OpenAIAdapter,
+    PdfAdapter,
+    StorageAdapter,
+)
+from domain.assistant import Assistant, AssistantId, ThreadId, VectorStoreId
+from domain.chunk import chunk_text
+from domain.document import DocumentId
+from domain.error import AppError, ErrorKind
+from domain.retrieval import Embeddings, load_index, top_k, write_index
+from domain.text import normalise_text
+
+_EMBEDDINGS_FILE: Final = "embeddings.npy"
+_CHUNKS_FILE: Final = "chunks.json"
+_EMBEDDING_BATCH_SIZE: Final = 256
+_INSTRUCTIONS: Final = """\
+あなたはアップロードされているPDFから特定の情報を抽出するための専用のアシスタントです。
+以下はPDFから質問に関連する部分を抜き出したものです。これを参考にしながらユーザーの質問に回答してください。
+"""
+
+
+def _write_files(
+    directory: str, vectors: list[list[float]], chunks: list[str]
+) -> None:
+    os.makedirs(directory, exist_ok=True)
+    write_index(os.path.join(directory, _EMBEDDINGS_FILE), vectors)
+    with open(os.path.join(directory, _CHUNKS_FILE), "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+
+
+def _read_files(directory: str) -> tuple[Embeddings, list[str]]:
+    with open(os.path.join(directory, _CHUNKS_FILE), encoding="utf-8") as f:
+        chunks: Final[list[str]] = json.load(f)
+    return load_index(os.path.join(directory, _EMBEDDINGS_FILE)), chunks
+
+
+# Assistants APIの代わりに、PDFのチャンクの埋め込みから近いものを探してchat_completionで回答する
+# 埋め込みはベクトルストアごとに.npyとしてCloud Storageに保存し、各インスタンスでは
+# ローカルにダウンロードしたものをメモリマップして使う
+@final
+class LocalRetrievalOpenAIImpl:
+    def __init__(
+        self,
+        inner: OpenAIAdapter,
+        pdf: PdfAdapter,
+        storage: StorageAdapter,
+        metrics: MetricsAdapter,
+        index_dir: str,
+        chunk_tokens: int,
+        chunk_overlap_tokens: int,
+        top_k: int,
+        index_cache_size: int,
+    ) -> None:
+        self.inner: Final = inner
+        self.pdf: Final = pdf
+        self.storage: Final = storage
+        self.metrics: Final = metrics
+        self.index_dir: Final = index_dir
+        self.chunk_tokens: Final = chunk_tokens
+        self.chunk_overlap_tokens: Final = chunk_overlap_tokens
+        self.top_k: Final = top_k
+        self.__indexes: Final[
+            LRUCache[VectorStoreId, tuple[Embeddings, list[str]]]
+        ] = LRUCache(maxsize=max(index_cache_size, 1))
+        self.__locks: Final[
+            weakref.WeakValueDictionary[VectorStoreId, asyncio.Lock]
+        ] = weakref.WeakValueDictionary()
+        # 以前のプロセスが残したファイルはキャッシュの管理外のため削除しておく
+        shutil.rmtree(index_dir, ignore_errors=True)
+        os.makedirs(index_dir, exist_ok=True)
+
+    @classmethod
+    def new(
+        cls,
+        inner: OpenAIAdapter,
+        pdf: PdfAdapter,
+        storage: StorageAdapter,
+        metrics: MetricsAdapter,
+        index_dir: str,
+        chunk_tokens: int,
+        chunk_overlap_tokens: int,
+        top_k: int,
+        index_cache_size: int,
+    ) -> OpenAIAdapter:
+        return cls(
+            inner,
+            pdf,
+            storage,
+            metrics,
+            index_dir,
+            chunk_tokens,
+            chunk_overlap_tokens,
+            top_k,
+            index_cache_size,
+        )
+
+    def __directory(self, vector_store_id: VectorStoreId) -> str:
+        return os.path.join(self.index_dir, vector_store_id)
+
+    @staticmethod
+    def __key(vector_store_id: VectorStoreId, name: str) -> str:
+        return f"retrieval/{vector_store_id}/{name}"
+
+    # 上限を超える分は古いものから追い出してファイルも削除する
+    # 検索中の処理はメモリマップしたままのため、削除しても読み込みは続けられる
+    # 他の処理と追い出しが重ならないよう、ここではawaitしない
+    def __put(
+        self, vector_store_id: VectorStoreId, loaded: tuple[Embeddings, list[str]]
+    ) -> None:
+        while len(self.__indexes) >= self.__indexes.maxsize:
+            evicted, _ = self.__indexes.popitem()
+            shutil.rmtree(self.__directory(evicted), ignore_errors=True)
+        self.__indexes[vector_store_id] = loaded
+
+    async def __load(
+        self, vector_store_id: VectorStoreId
+    ) -> tuple[Embeddings, list[str]]:
+        lock: Final = self.__locks.setdefault(vector_store_id, asyncio.Lock())
+
+        # 同じインデックスを同時に要求された場合は、最初の読み込みを待ってキャッシュから返す
+        async with lock:
+            cached: Final[Optional[tuple[Embeddings, list[str]]]] = (
+                self.__indexes.get(vector_store_id)
+            )
+            if cached is not None:
+                return cached
+
+            directory: Final = self.__directory(vector_store_id)
+            try:
+                if not os.path.exists(os.path.join(directory, _CHUNKS_FILE)):
+                    os.makedirs(directory, exist_ok=True)
+                    # 途中で失敗しても壊れたファイルが残らないよう、一時ファイルから置き換える
+                    # チャンクのファイルを最後に置き、揃っていることの目印にする
+                    for name in (_EMBEDDINGS_FILE, _CHUNKS_FILE):
+                        path = os.path.join(directory, name)
+                        await self.storage.download_object(
+                            self.__key(vector_store_id, name), f"{path}.download"
+                        )
+                        os.replace(f"{path}.download", path)
+                loaded: Final = await asyncio.to_thread(_read_files, directory)
+            except BaseException:
+                await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+                raise
+            self.__put(vector_store_id, loaded)
+            return loaded
+
+    async def __answer(self, _assistant: Assistant, message: str) -> str:
+        if _assistant.vector_store_id is None:
+            raise AppError(
+                ErrorKind.BAD_REQUEST, "検索用のインデックスが作成されていません"
+            )
+        started_at: Final = time.perf_counter()
+        index, chunks = await self.__load(_assistant.vector_store_id)
+        query: Final = (await self.inner.create_embeddings([message]))[0]
+        hits: Final = await asyncio.to_thread(top_k, index, query, self.top_k)
+        self.metrics.observe(
+            "local_retrieval_seconds", time.perf_counter() - started_at
+        )
+
+        context: Final = "\n\n".join(chunks[i] for i in hits)
+        return await self.inner.chat_completion(
+            [
+                ChatMessage(role="system", content=f"{_INSTRUCTIONS}\n{context}"),
+                ChatMessage(role="user", content=message),
+            ]
+        )
+
+    async def chat_assistant(self, _assistant: Assistant, message: str) -> str:
+        return await self.__answer(_assistant, message)
+
+    async def stream_chat_assistant(
+        self, _assistant: Assistant, message: str
+    ) -> AsyncGenerator[str, None]:
+        yield await self.__answer(_assistant, message)
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        chunks: Final[list[str]] = []
+        async with aclosing(self.pdf.extract_pages(document)) as pages:
+            async for chunk in chunk_text(
+                normalise_text(pages), self.chunk_tokens, self.chunk_overlap_tokens
+            ):
+                chunks.append(chunk)
+        if not chunks:
+            raise AppError(
+                ErrorKind.BAD_REQUEST, "PDFからテキストを抽出できませんでした"
+            )
+
+        batches: Final = await asyncio.gather(
+            *(
+                self.inner.create_embeddings(chunks[i : i + _EMBEDDING_BATCH_SIZE])
+                for i in range(0, len(chunks), _EMBEDDING_BATCH_SIZE)
+            )
+        )
+        vectors: Final = [vector for batch in batches for vector in batch]
+
+        vector_store_id: Final = VectorStoreId(f"local-{uuid.uuid4()}")
+        directory: Final = self.__directory(vector_store_id)
+        try:
+            await asyncio.to_thread(_write_files, directory, vectors, chunks)
+            for name in (_EMBEDDINGS_FILE, _CHUNKS_FILE):
+                await self.storage.upload_object(
+                    self.__key(vector_store_id, name), os.path.join(directory, name)
+                )
+            loaded: Final = await asyncio.to_thread(_read_files, directory)
+        except BaseException:
+            await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+            raise
+        # 書き出したファイルもキャッシュに載せ、追い出されるときに削除されるようにする
+        self.__put(vector_store_id, loaded)
+        return vector_store_id
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        self.__indexes.pop(vector_store_id, None)
+        await asyncio.to_thread(
+            shutil.rmtree, self.__directory(vector_store_id), ignore_errors=True
+        )
+        for name in (_EMBEDDINGS_FILE, _CHUNKS_FILE):
+            try:
+                await self.storage.delete_object(self.__key(vector_store_id, name))
+            except AppError as e:
+                if e.kind != ErrorKind.NOT_FOUND:
+                    raise
+
+    # 会話の状態はOpenAI側に持たないため、アシスタントとスレッドはIDだけを発行する
+    async def create_assistant(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        return await self.create_pooled_assistant()
+
+    async def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        return (
+            AssistantId(f"local-{uuid.uuid4()}"),
+            ThreadId(f"local-{uuid.uuid4()}"),
+        )
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        pass
+
+    async def delete_assistant(self, assistant_id: AssistantId) -> None:
+        pass
+
+    async def chat_completion(self, messages: list[ChatMessage]) -> str:
+        return await self.inner.chat_completion(messages)
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await self.inner.create_embeddings(texts)
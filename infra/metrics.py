@@ -0,0 +1,54 @@
+import threading
+from typing import Final, final, Optional
+
+from adapter.adapter import MetricsAdapter
+
+
+def _series(name: str, labels: Optional[dict[str, str]]) -> str:
+    if not labels:
+        return name
+    joined: Final = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{joined}}}"
+
+
+@final
+class InMemoryMetricsImpl:
+    def __init__(self) -> None:
+        # 同期版のアダプタはスレッドから呼ばれるためロックで保護する
+        self.__lock: Final = threading.Lock()
+        self.__counters: Final[dict[str, float]] = {}
+        self.__observations: Final[dict[str, dict[str, float]]] = {}
+
+    @classmethod
+    def new(cls) -> MetricsAdapter:
+        return cls()
+
+    def incr(
+        self, name: str, value: float = 1, labels: Optional[dict[str, str]] = None
+    ) -> None:
+        series: Final = _series(name, labels)
+        with self.__lock:
+            self.__counters[series] = self.__counters.get(series, 0) + value
+
+    def observe(
+        self, name: str, value: float, labels: Optional[dict[str, str]] = None
+    ) -> None:
+        series: Final = _series(name, labels)
+        with self.__lock:
+            current = self.__observations.get(series)
+            if current is None:
+                self.__observations[series] = {
+                    "count": 1,
+                    "sum": value,
+                    "max": value,
+                }
+            else:
+                current["count"] += 1
+                current["sum"] += value
+                current["max"] = max(current["max"], value)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self.__lock:
+            result: Final = {k: {"value": v} for k, v in self.__counters.items()}
+            result.update({k: dict(v) for k, v in self.__observations.items()})
+            return result
@@ -1,12 +1,16 @@
 import asyncio
+import json
+import threading
 import time
-from typing import Final, final
+from typing import AsyncGenerator, BinaryIO, Final, final, Generator, Optional
 
-from openai import OpenAI
-from openai.pagination import SyncCursorPage
-from openai.types.beta.assistant import Assistant
+import httpx
+from cachetools import TTLCache
+from openai import APIError, AsyncOpenAI, OpenAI
+from openai.pagination import AsyncCursorPage, SyncCursorPage
 from openai.types.beta.thread import Thread
 from openai.types.beta.threads import MessageContent, TextContentBlock, Run, Message
+from openai.types.chat import ChatCompletion
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from openai.types.chat.chat_completion_system_message_param import (
     ChatCompletionSystemMessageParam,
@@ -15,14 +19,103 @@ from openai.types.chat.chat_completion_user_message_param import (
     ChatCompletionUserMessageParam,
 )
 
-from adapter.adapter import OpenAIAdapter, ChatMessage
-from domain.assistant import Assistant as AppAssistant, AssistantId, ThreadId
+from adapter.adapter import OpenAIAdapter, ChatMessage, LogAdapter, MetricsAdapter
+from config.envs import OPENAI_MODEL, OPENAI_EMBEDDING_MODEL
+from domain.assistant import (
+    Assistant as AppAssistant,
+    AssistantId,
+    ThreadId,
+    VectorStoreId,
+)
 from domain.document import (
     DocumentId,
 )
 from domain.error import AppError, ErrorKind
+from domain.usage import current_retries, current_usage_tags
 
-MODEL: Final = "gpt-4o-2024-11-20"
+_RUN_PENDING_STATUSES: Final = ("queued", "in_progress", "cancelling")
+# ポーリングの間隔は短く始めて倍々に伸ばし、上限で打ち止めにする
+_RUN_POLL_INITIAL_SECONDS: Final = 0.1
+_RUN_POLL_MAX_SECONDS: Final = 2.0
+_HANDLE_CACHE_SIZE: Final = 4096
+CHAT_COMPLETION_MAX_TOKENS: Final = 1000
+_ASSISTANT_DESCRIPTION: Final = "顧客向けアシスタント"
+_ASSISTANT_INSTRUCTIONS: Final = """\
+        あなたはアップロードされているPDFから特定の情報を抽出するための専用のアシスタントです。
+        PDFの情報を参考にしながらユーザーの質問に回答してください
+    """
+_THREAD_FIRST_MESSAGE: Final = "PDFの情報を元にこれからの質問に回答してください"
+# ウォームプールのアシスタントはドキュメントに割り当てるまでこの名前にしておく
+_POOLED_ASSISTANT_NAME: Final = "pooled"
+# ファイル検索は拡張子でファイルの形式を判定するため、送るPDFにはこの名前を付ける
+_DOCUMENT_FILE_NAME: Final = "document.pdf"
+
+
+# 存在を確認済みのアシスタントとスレッドの組をTTLの間だけ覚えておく
+# TTLが0の場合は確認せず、保存しているIDをそのまま使う
+@final
+class _ValidatedHandles:
+    def __init__(self, ttl_seconds: float) -> None:
+        self.__cache: Final[Optional[TTLCache[tuple[str, str], bool]]] = (
+            TTLCache(maxsize=_HANDLE_CACHE_SIZE, ttl=ttl_seconds)
+            if ttl_seconds > 0
+            else None
+        )
+        self.__lock: Final = threading.Lock()
+
+    def needs_validation(self, assistant: AppAssistant) -> bool:
+        if self.__cache is None:
+            return False
+        with self.__lock:
+            return (assistant.id, assistant.thread_id) not in self.__cache
+
+    def validated(self, assistant: AppAssistant) -> None:
+        if self.__cache is None:
+            return
+        with self.__lock:
+            self.__cache[(assistant.id, assistant.thread_id)] = True
+
+
+def _completion_tokens(response: ChatCompletion) -> tuple[int, int]:
+    if response.usage is None:
+        return 0, 0
+    return response.usage.prompt_tokens, response.usage.completion_tokens
+
+
+def _run_tokens(run: Optional[Run]) -> tuple[int, int]:
+    if run is None or run.usage is None:
+        return 0, 0
+    return run.usage.prompt_tokens, run.usage.completion_tokens
+
+
+# 呼び出しごとの所要時間とトークン数を記録する
+# ドキュメントとユーザーごとの内訳はメトリクスの系列が際限なく増えるため、ログに1行ずつ出す
+def _record_usage(
+    metrics: MetricsAdapter,
+    log: LogAdapter,
+    operation: str,
+    model: str,
+    started_at: float,
+    tokens: tuple[int, int],
+) -> None:
+    seconds: Final = time.perf_counter() - started_at
+    labels: Final = {"operation": operation, "model": model}
+    metrics.observe("openai_call_seconds", seconds, labels)
+    metrics.incr("openai_prompt_tokens", tokens[0], labels)
+    metrics.incr("openai_completion_tokens", tokens[1], labels)
+    log.log_info(
+        json.dumps(
+            {
+                "event": "openai_usage",
+                **labels,
+                **current_usage_tags().labels(),
+                "seconds": round(seconds, 3),
+                "prompt_tokens": tokens[0],
+                "completion_tokens": tokens[1],
+                "retries": current_retries(),
+            }
+        )
+    )
 
 
 @final
@@ -30,38 +123,91 @@ class OpenAIImpl:
     def __init__(
         self,
         cli: OpenAI,
+        metrics: MetricsAdapter,
+        log: LogAdapter,
+        stream_runs: bool,
+        handle_cache_ttl_seconds: float,
     ) -> None:
         self.cli: Final = cli
+        self.metrics: Final = metrics
+        self.log: Final = log
+        self.stream_runs: Final = stream_runs
+        self.handles: Final = _ValidatedHandles(handle_cache_ttl_seconds)
+
+    # 実行のイベントストリームを読み切って完了を待つ
+    # ストリームを使わない場合や途中で切れた場合はポーリングで待つ
+    def __run(self, thread_id: str, assistant_id: str) -> Run:
+        started_at: Final = time.perf_counter()
+        mode = "poll"
+        run: Optional[Run] = None
+        if self.stream_runs:
+            try:
+                with self.cli.beta.threads.runs.stream(
+                    thread_id=thread_id, assistant_id=assistant_id
+                ) as stream:
+                    try:
+                        stream.until_done()
+                    finally:
+                        run = stream.current_run
+            except (APIError, httpx.HTTPError):
+                if run is None:
+                    raise
+        if run is None:
+            run = self.cli.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+            )
+        elif run.status not in _RUN_PENDING_STATUSES:
+            mode = "stream"
+        run = self.__wait_on_run(run, thread_id)
+        self.metrics.observe(
+            "openai_run_wait_seconds",
+            time.perf_counter() - started_at,
+            {"mode": mode},
+        )
+        if run.status != "completed":
+            raise AppError(
+                ErrorKind.INTERNAL, f"アシスタントの実行に失敗しました: {run.status}"
+            )
+        return run
 
-    def __wait_on_run(self, run: Run, thread: Thread) -> Run:
-        while run.status == "queued" or run.status == "in_progress":
+    def __wait_on_run(self, run: Run, thread_id: str) -> Run:
+        delay = _RUN_POLL_INITIAL_SECONDS
+        while run.status in _RUN_PENDING_STATUSES:
+            time.sleep(delay)
+            delay = min(delay * 2, _RUN_POLL_MAX_SECONDS)
             run = self.cli.beta.threads.runs.retrieve(
-                thread_id=thread.id,
+                thread_id=thread_id,
                 run_id=run.id,
             )
-            time.sleep(0.5)
         return run
 
+    def __validate_handles(self, _assistant: AppAssistant) -> None:
+        if self.handles.needs_validation(_assistant):
+            self.cli.beta.assistants.retrieve(assistant_id=_assistant.id)
+            self.cli.beta.threads.retrieve(thread_id=_assistant.thread_id)
+            self.handles.validated(_assistant)
+
     def chat_assistant(self, _assistant: AppAssistant, message: str) -> str:
-        assistant: Final[Assistant] = self.cli.beta.assistants.retrieve(
-            assistant_id=_assistant.id
-        )
-        thread: Final[Thread] = self.cli.beta.threads.retrieve(
-            thread_id=_assistant.thread_id
-        )
+        started_at: Final = time.perf_counter()
+        self.__validate_handles(_assistant)
 
         new_message: Final[Message] = self.cli.beta.threads.messages.create(
-            thread_id=thread.id,
+            thread_id=_assistant.thread_id,
             role="user",
             content=message,
         )
-        run: Final[Run] = self.cli.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant.id,
-        )
-        self.__wait_on_run(run, thread)
+        run: Final = self.__run(_assistant.thread_id, _assistant.id)
         response: SyncCursorPage[Message] = self.cli.beta.threads.messages.list(
-            thread_id=thread.id, order="asc", after=new_message.id
+            thread_id=_assistant.thread_id, order="asc", after=new_message.id
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "chat_assistant",
+            run.model,
+            started_at,
+            _run_tokens(run),
         )
 
         if (
@@ -77,75 +223,139 @@ class OpenAIImpl:
         else:
             raise AppError(ErrorKind.INTERNAL)
 
+    def stream_chat_assistant(
+        self, _assistant: AppAssistant, message: str
+    ) -> Generator[str, None, None]:
+        self.__validate_handles(_assistant)
+
+        self.cli.beta.threads.messages.create(
+            thread_id=_assistant.thread_id,
+            role="user",
+            content=message,
+        )
+        started_at: Final = time.perf_counter()
+        with self.cli.beta.threads.runs.stream(
+            thread_id=_assistant.thread_id, assistant_id=_assistant.id
+        ) as stream:
+            yield from stream.text_deltas
+            run: Final = stream.current_run
+        self.metrics.observe(
+            "openai_run_wait_seconds",
+            time.perf_counter() - started_at,
+            {"mode": "stream"},
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "stream_chat_assistant",
+            run.model if run else OPENAI_MODEL,
+            started_at,
+            _run_tokens(run),
+        )
+        if run is None or run.status != "completed":
+            raise AppError(
+                ErrorKind.INTERNAL,
+                f"アシスタントの実行に失敗しました: {run.status if run else None}",
+            )
+
+    def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        vector_store = self.cli.beta.vector_stores.create(name="PDF Statements")
+        document.seek(0)
+        self.cli.beta.vector_stores.file_batches.upload_and_poll(
+            vector_store_id=vector_store.id, files=[(_DOCUMENT_FILE_NAME, document)]
+        )
+        return VectorStoreId(vector_store.id)
+
+    def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        self.cli.beta.vector_stores.delete(vector_store_id=vector_store_id)
+
     def create_assistant(
-        self, document_id: DocumentId, document_path: str
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
     ) -> tuple[AssistantId, ThreadId]:
         assistant = self.cli.beta.assistants.create(
             name=document_id,
-            description=f"顧客向けアシスタント",
-            model=MODEL,
-            instructions="""\
-        あなたはアップロードされているPDFから特定の情報を抽出するための専用のアシスタントです。
-        PDFの情報を参考にしながらユーザーの質問に回答してください
-    """,
+            description=_ASSISTANT_DESCRIPTION,
+            model=OPENAI_MODEL,
+            instructions=_ASSISTANT_INSTRUCTIONS,
             tools=[
                 {"type": "code_interpreter"},
                 {"type": "file_search"},
             ],
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
         )
 
-        vector_store = self.cli.beta.vector_stores.create(name="PDF Statements")
-        file_streams = [open(document_path, "rb")]
-        self.cli.beta.vector_stores.file_batches.upload_and_poll(
-            vector_store_id=vector_store.id, files=file_streams
+        thread: Final[Thread] = self.cli.beta.threads.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": _THREAD_FIRST_MESSAGE,
+                }
+            ]
         )
-        assistant = self.cli.beta.assistants.update(
-            assistant_id=assistant.id,
-            tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}},
+
+        return AssistantId(assistant.id), ThreadId(thread.id)
+
+    def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        assistant = self.cli.beta.assistants.create(
+            name=_POOLED_ASSISTANT_NAME,
+            description=_ASSISTANT_DESCRIPTION,
+            model=OPENAI_MODEL,
+            instructions=_ASSISTANT_INSTRUCTIONS,
+            tools=[
+                {"type": "code_interpreter"},
+                {"type": "file_search"},
+            ],
         )
 
         thread: Final[Thread] = self.cli.beta.threads.create(
             messages=[
                 {
                     "role": "user",
-                    "content": "PDFの情報を元にこれからの質問に回答してください",
+                    "content": _THREAD_FIRST_MESSAGE,
                 }
             ]
         )
 
         return AssistantId(assistant.id), ThreadId(thread.id)
 
+    def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        self.cli.beta.assistants.update(
+            assistant_id=assistant_id,
+            name=document_id,
+            instructions=_ASSISTANT_INSTRUCTIONS,
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+        )
+
     def delete_assistant(self, assistant_id: AssistantId) -> None:
         self.cli.beta.assistants.delete(assistant_id=assistant_id)
 
     def chat_completion(self, messages: list[ChatMessage]) -> str:
-        params: list[ChatCompletionMessageParam] = []
-        for message in messages:
-            if message.role == "system":
-                params.append(
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=message.content,
-                    )
-                )
-            if message.role == "user":
-                params.append(
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=message.content,
-                    )
-                )
+        params: Final = _chat_params(messages)
 
         try:
+            started_at = time.perf_counter()
             response = self.cli.chat.completions.create(
-                model=MODEL,
+                model=OPENAI_MODEL,
                 messages=params,
-                max_tokens=1000,
+                max_tokens=CHAT_COMPLETION_MAX_TOKENS,
                 n=1,
                 stop=None,
                 temperature=0.7,
                 top_p=1,
             )
+            _record_usage(
+                self.metrics,
+                self.log,
+                "chat_completion",
+                response.model,
+                started_at,
+                _completion_tokens(response),
+            )
             text = response.choices[0].message.content
             if text is None:
                 raise AppError(ErrorKind.INTERNAL, "OpenAIでエラーが発生しました")
@@ -153,6 +363,41 @@ class OpenAIImpl:
         except Exception as e:
             raise AppError(ErrorKind.INTERNAL, f"OpenAIでエラーが発生しました") from e
 
+    def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        started_at: Final = time.perf_counter()
+        response: Final = self.cli.embeddings.create(
+            model=OPENAI_EMBEDDING_MODEL, input=texts
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "create_embeddings",
+            response.model,
+            started_at,
+            (response.usage.prompt_tokens, 0),
+        )
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+def _chat_params(messages: list[ChatMessage]) -> list[ChatCompletionMessageParam]:
+    params: Final[list[ChatCompletionMessageParam]] = []
+    for message in messages:
+        if message.role == "system":
+            params.append(
+                ChatCompletionSystemMessageParam(
+                    role="system",
+                    content=message.content,
+                )
+            )
+        if message.role == "user":
+            params.append(
+                ChatCompletionUserMessageParam(
+                    role="user",
+                    content=message.content,
+                )
+            )
+    return params
+
 
 @final
 class AsyncOpenAIImpl:
@@ -175,19 +420,372 @@ class AsyncOpenAIImpl:
         )
         return res
 
+    async def stream_chat_assistant(
+        self, _assistant: AppAssistant, message: str
+    ) -> AsyncGenerator[str, None]:
+        texts: Final = self.inner.stream_chat_assistant(_assistant, message)
+        try:
+            while True:
+                text = await asyncio.to_thread(next, texts, None)
+                if text is None:
+                    return
+                yield text
+        finally:
+            await asyncio.to_thread(texts.close)
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        res = await asyncio.to_thread(self.inner.create_vector_store, document=document)
+        return res
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        await asyncio.to_thread(
+            self.inner.delete_vector_store, vector_store_id=vector_store_id
+        )
+
     async def create_assistant(
-        self, document_id: DocumentId, document_path: str
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
     ) -> tuple[AssistantId, ThreadId]:
         res = await asyncio.to_thread(
             self.inner.create_assistant,
             document_id=document_id,
-            document_path=document_path,
+            vector_store_id=vector_store_id,
         )
         return res
 
+    async def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        res = await asyncio.to_thread(self.inner.create_pooled_assistant)
+        return res
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        await asyncio.to_thread(
+            self.inner.attach_assistant,
+            assistant_id=assistant_id,
+            document_id=document_id,
+            vector_store_id=vector_store_id,
+        )
+
     async def delete_assistant(self, assistant_id: AssistantId) -> None:
         await asyncio.to_thread(self.inner.delete_assistant, assistant_id=assistant_id)
 
     async def chat_completion(self, messages: list[ChatMessage]) -> str:
         res = await asyncio.to_thread(self.inner.chat_completion, messages=messages)
         return res
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        res = await asyncio.to_thread(self.inner.create_embeddings, texts=texts)
+        return res
+
+
+# AsyncOpenAIを直接使い、スレッドを占有せずにイベントループ上でリクエストを待つ
+# HTTPクライアントのコネクションプールはDIで生成したものを全リクエストで共有する
+@final
+class NativeAsyncOpenAIImpl:
+    def __init__(
+        self,
+        cli: AsyncOpenAI,
+        request_timeout: httpx.Timeout,
+        metrics: MetricsAdapter,
+        log: LogAdapter,
+        stream_runs: bool,
+        handle_cache_ttl_seconds: float,
+    ) -> None:
+        self.cli: Final = cli
+        self.request_timeout: Final = request_timeout
+        self.metrics: Final = metrics
+        self.log: Final = log
+        self.stream_runs: Final = stream_runs
+        self.handles: Final = _ValidatedHandles(handle_cache_ttl_seconds)
+
+    @classmethod
+    def new(
+        cls,
+        cli: AsyncOpenAI,
+        request_timeout: httpx.Timeout,
+        metrics: MetricsAdapter,
+        log: LogAdapter,
+        stream_runs: bool,
+        handle_cache_ttl_seconds: float,
+    ) -> OpenAIAdapter:
+        return cls(
+            cli, request_timeout, metrics, log, stream_runs, handle_cache_ttl_seconds
+        )
+
+    async def __run(self, thread_id: str, assistant_id: str) -> Run:
+        started_at: Final = time.perf_counter()
+        mode = "poll"
+        run: Optional[Run] = None
+        if self.stream_runs:
+            try:
+                async with self.cli.beta.threads.runs.stream(
+                    thread_id=thread_id,
+                    assistant_id=assistant_id,
+                    timeout=self.request_timeout,
+                ) as stream:
+                    try:
+                        await stream.until_done()
+                    finally:
+                        run = stream.current_run
+            except (APIError, httpx.HTTPError):
+                if run is None:
+                    raise
+        if run is None:
+            run = await self.cli.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                timeout=self.request_timeout,
+            )
+        elif run.status not in _RUN_PENDING_STATUSES:
+            mode = "stream"
+        run = await self.__wait_on_run(run, thread_id)
+        self.metrics.observe(
+            "openai_run_wait_seconds",
+            time.perf_counter() - started_at,
+            {"mode": mode},
+        )
+        if run.status != "completed":
+            raise AppError(
+                ErrorKind.INTERNAL, f"アシスタントの実行に失敗しました: {run.status}"
+            )
+        return run
+
+    async def __wait_on_run(self, run: Run, thread_id: str) -> Run:
+        delay = _RUN_POLL_INITIAL_SECONDS
+        while run.status in _RUN_PENDING_STATUSES:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RUN_POLL_MAX_SECONDS)
+            run = await self.cli.beta.threads.runs.retrieve(
+                thread_id=thread_id,
+                run_id=run.id,
+                timeout=self.request_timeout,
+            )
+        return run
+
+    async def __validate_handles(self, _assistant: AppAssistant) -> None:
+        if self.handles.needs_validation(_assistant):
+            await asyncio.gather(
+                self.cli.beta.assistants.retrieve(
+                    assistant_id=_assistant.id, timeout=self.request_timeout
+                ),
+                self.cli.beta.threads.retrieve(
+                    thread_id=_assistant.thread_id, timeout=self.request_timeout
+                ),
+            )
+            self.handles.validated(_assistant)
+
+    async def chat_assistant(self, _assistant: AppAssistant, message: str) -> str:
+        started_at: Final = time.perf_counter()
+        await self.__validate_handles(_assistant)
+
+        new_message: Final[Message] = await self.cli.beta.threads.messages.create(
+            thread_id=_assistant.thread_id,
+            role="user",
+            content=message,
+            timeout=self.request_timeout,
+        )
+        run: Final = await self.__run(_assistant.thread_id, _assistant.id)
+        response: AsyncCursorPage[Message] = await self.cli.beta.threads.messages.list(
+            thread_id=_assistant.thread_id,
+            order="asc",
+            after=new_message.id,
+            timeout=self.request_timeout,
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "chat_assistant",
+            run.model,
+            started_at,
+            _run_tokens(run),
+        )
+
+        if (
+            response.data
+            and response.data[0].content
+            and len(response.data[0].content) > 0
+        ):
+            content: MessageContent = response.data[0].content[0]
+            if isinstance(content, TextContentBlock):
+                return content.text.value
+            else:
+                raise AppError(ErrorKind.INTERNAL)
+        else:
+            raise AppError(ErrorKind.INTERNAL)
+
+    async def stream_chat_assistant(
+        self, _assistant: AppAssistant, message: str
+    ) -> AsyncGenerator[str, None]:
+        await self.__validate_handles(_assistant)
+
+        await self.cli.beta.threads.messages.create(
+            thread_id=_assistant.thread_id,
+            role="user",
+            content=message,
+            timeout=self.request_timeout,
+        )
+        started_at: Final = time.perf_counter()
+        async with self.cli.beta.threads.runs.stream(
+            thread_id=_assistant.thread_id,
+            assistant_id=_assistant.id,
+            timeout=self.request_timeout,
+        ) as stream:
+            async for text in stream.text_deltas:
+                yield text
+            run: Final = stream.current_run
+        self.metrics.observe(
+            "openai_run_wait_seconds",
+            time.perf_counter() - started_at,
+            {"mode": "stream"},
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "stream_chat_assistant",
+            run.model if run else OPENAI_MODEL,
+            started_at,
+            _run_tokens(run),
+        )
+        if run is None or run.status != "completed":
+            raise AppError(
+                ErrorKind.INTERNAL,
+                f"アシスタントの実行に失敗しました: {run.status if run else None}",
+            )
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        vector_store = await self.cli.beta.vector_stores.create(
+            name="PDF Statements", timeout=self.request_timeout
+        )
+        # PDFはメモリ上か(Cloud Runではメモリ上にある)/tmpにあるため、読み込みで待たされることはない
+        # アップロードにはクライアント全体のタイムアウトが適用される
+        document.seek(0)
+        await self.cli.beta.vector_stores.file_batches.upload_and_poll(
+            vector_store_id=vector_store.id, files=[(_DOCUMENT_FILE_NAME, document)]
+        )
+        return VectorStoreId(vector_store.id)
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        await self.cli.beta.vector_stores.delete(
+            vector_store_id=vector_store_id, timeout=self.request_timeout
+        )
+
+    async def create_assistant(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        assistant = await self.cli.beta.assistants.create(
+            name=document_id,
+            description=_ASSISTANT_DESCRIPTION,
+            model=OPENAI_MODEL,
+            instructions=_ASSISTANT_INSTRUCTIONS,
+            tools=[
+                {"type": "code_interpreter"},
+                {"type": "file_search"},
+            ],
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+            timeout=self.request_timeout,
+        )
+
+        thread: Final[Thread] = await self.cli.beta.threads.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": _THREAD_FIRST_MESSAGE,
+                }
+            ],
+            timeout=self.request_timeout,
+        )
+
+        return AssistantId(assistant.id), ThreadId(thread.id)
+
+    async def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        assistant, thread = await asyncio.gather(
+            self.cli.beta.assistants.create(
+                name=_POOLED_ASSISTANT_NAME,
+                description=_ASSISTANT_DESCRIPTION,
+                model=OPENAI_MODEL,
+                instructions=_ASSISTANT_INSTRUCTIONS,
+                tools=[
+                    {"type": "code_interpreter"},
+                    {"type": "file_search"},
+                ],
+                timeout=self.request_timeout,
+            ),
+            self.cli.beta.threads.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": _THREAD_FIRST_MESSAGE,
+                    }
+                ],
+                timeout=self.request_timeout,
+            ),
+        )
+
+        return AssistantId(assistant.id), ThreadId(thread.id)
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        await self.cli.beta.assistants.update(
+            assistant_id=assistant_id,
+            name=document_id,
+            instructions=_ASSISTANT_INSTRUCTIONS,
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+            timeout=self.request_timeout,
+        )
+
+    async def delete_assistant(self, assistant_id: AssistantId) -> None:
+        await self.cli.beta.assistants.delete(
+            assistant_id=assistant_id, timeout=self.request_timeout
+        )
+
+    async def chat_completion(self, messages: list[ChatMessage]) -> str:
+        params: Final = _chat_params(messages)
+
+        try:
+            started_at = time.perf_counter()
+            response = await self.cli.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=params,
+                max_tokens=CHAT_COMPLETION_MAX_TOKENS,
+                n=1,
+                stop=None,
+                temperature=0.7,
+                top_p=1,
+                timeout=self.request_timeout,
+            )
+            _record_usage(
+                self.metrics,
+                self.log,
+                "chat_completion",
+                response.model,
+                started_at,
+                _completion_tokens(response),
+            )
+            text = response.choices[0].message.content
+            if text is None:
+                raise AppError(ErrorKind.INTERNAL, "OpenAIでエラーが発生しました")
+            return text
+        except Exception as e:
+            raise AppError(ErrorKind.INTERNAL, f"OpenAIでエラーが発生しました") from e
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        started_at: Final = time.perf_counter()
+        response: Final = await self.cli.embeddings.create(
+            model=OPENAI_EMBEDDING_MODEL, input=texts, timeout=self.request_timeout
+        )
+        _record_usage(
+            self.metrics,
+            self.log,
+            "create_embeddings",
+            response.model,
+            started_at,
+            (response.usage.prompt_tokens, 0),
+        )
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
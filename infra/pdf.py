@@ -0,0 +1,138 @@
+import asyncio
+import io
+import os
+import sys
+import time
+from asyncio import StreamReader, StreamWriter
+from asyncio.subprocess import DEVNULL, PIPE, Process
+from collections import deque
+from typing import BinaryIO, Final, final, AsyncGenerator, Optional
+
+from adapter.adapter import PdfAdapter
+from domain.error import AppError, ErrorKind
+from infra.pdf_worker import FRAME_HEADER
+
+_WORKER_PATH: Final[str] = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "pdf_worker.py"
+)
+
+
+@final
+class PdfMinerImpl:
+    def __init__(
+        self,
+        max_workers: int,
+        timeout_seconds: float,
+        memory_limit_mb: int,
+    ) -> None:
+        self.timeout_seconds: Final = timeout_seconds
+        self.memory_limit_mb: Final = memory_limit_mb
+        self.__semaphore: Final = asyncio.Semaphore(max_workers)
+
+    @classmethod
+    def new(
+        cls,
+        max_workers: int,
+        timeout_seconds: float,
+        memory_limit_mb: int,
+    ) -> PdfAdapter:
+        return cls(
+            max_workers=max_workers,
+            timeout_seconds=timeout_seconds,
+            memory_limit_mb=memory_limit_mb,
+        )
+
+    async def extract_pages(self, document: BinaryIO) -> AsyncGenerator[str, None]:
+        # メモリ上のPDFは標準入力から渡す
+        # ファイルの場合はディスクリプタを引き継ぎ、ワーカー側でメモリマップする
+        in_memory: Final = isinstance(document, io.BytesIO)
+        fd: Final = 0 if in_memory else document.fileno()
+
+        # pdfminerはCPUを占有するため、イベントループを止めないよう別プロセスで実行する
+        async with self.__semaphore:
+            proc: Final = await asyncio.create_subprocess_exec(
+                sys.executable,
+                _WORKER_PATH,
+                str(fd),
+                str(self.memory_limit_mb),
+                stdin=PIPE if in_memory else DEVNULL,
+                stdout=PIPE,
+                stderr=PIPE,
+                pass_fds=() if in_memory else (fd,),
+            )
+            assert proc.stdout is not None and proc.stderr is not None
+            # pdfminerの警告でstderrのパイプが詰まらないよう、末尾だけを残して読み捨てる
+            stderr_tail: Final[deque[str]] = deque(maxlen=5)
+            stderr_task: Final = asyncio.create_task(
+                self.__drain(proc.stderr, stderr_tail)
+            )
+            stdin_task: Final = (
+                asyncio.create_task(self.__feed(proc.stdin, document))
+                if proc.stdin is not None and isinstance(document, io.BytesIO)
+                else None
+            )
+            try:
+                # 呼び出し側の処理待ちは含めず、ワーカーを待っている時間だけをタイムアウトの対象にする
+                waited = 0.0
+                while True:
+                    started_at = time.monotonic()
+                    try:
+                        page = await asyncio.wait_for(
+                            self.__read_page(proc.stdout),
+                            self.timeout_seconds - waited,
+                        )
+                    except TimeoutError as e:
+                        raise AppError(
+                            ErrorKind.INTERNAL,
+                            "PDFのテキスト抽出がタイムアウトしました",
+                        ) from e
+                    waited += time.monotonic() - started_at
+                    if page is None:
+                        break
+                    yield page
+
+                await proc.wait()
+                await stderr_task
+                if stdin_task is not None:
+                    await stdin_task
+                if proc.returncode != 0:
+                    reason: Final = stderr_tail[-1] if stderr_tail else proc.returncode
+                    raise AppError(
+                        ErrorKind.INTERNAL, f"PDFのテキスト抽出に失敗しました: {reason}"
+                    )
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                stderr_task.cancel()
+                if stdin_task is not None:
+                    stdin_task.cancel()
+
+    @staticmethod
+    async def __read_page(stdout: StreamReader) -> Optional[str]:
+        # ワーカーが異常終了して途中までしか書き込まれていない場合もEOFとして扱い、終了コードで判定する
+        try:
+            header: Final = await stdout.readexactly(FRAME_HEADER.size)
+            (size,) = FRAME_HEADER.unpack(header)
+            data: Final = await stdout.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return None
+        return data.decode("utf-8")
+
+    @staticmethod
+    async def __feed(stdin: StreamWriter, document: io.BytesIO) -> None:
+        # ワーカーが途中で終了した場合の書き込みエラーは、終了コードの方で判定する
+        try:
+            with document.getbuffer() as view:
+                stdin.write(view)
+            await stdin.drain()
+            stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    @staticmethod
+    async def __drain(stderr: StreamReader, tail: deque[str]) -> None:
+        async for line in stderr:
+            text = line.decode(errors="replace").strip()
+            if text:
+                tail.append(text)
@@ -0,0 +1,56 @@
+import mmap
+import resource
+import struct
+import sys
+from io import BytesIO, StringIO
+from typing import Final, BinaryIO, Iterator, cast
+
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+
+FRAME_HEADER: Final = struct.Struct(">I")
+
+
+def _write_frame(out: BinaryIO, text: str) -> None:
+    data: Final = text.encode("utf-8")
+    out.write(FRAME_HEADER.pack(len(data)))
+    out.write(data)
+    out.flush()
+
+
+def iter_pages(fp: BinaryIO) -> Iterator[str]:
+    # ページごとにテキストを取り出し、ドキュメント全体を1つの文字列として保持しない
+    with StringIO() as output:
+        rsrcmgr: Final = PDFResourceManager(caching=True)
+        device: Final = TextConverter(rsrcmgr, output, laparams=LAParams())
+        interpreter: Final = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, caching=True):
+            interpreter.process_page(page)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+        device.close()
+
+
+# 親プロセスの設定(config.envs)を読み込まないように、pdfminer以外に依存しない単独のスクリプトとして起動する
+# PDFは親プロセスから引き継いだファイルディスクリプタで受け取る
+# 0(標準入力)の場合はパイプで送られてくる内容をすべて読み込み、それ以外はメモリマップして読む
+def main() -> None:
+    fd: Final = int(sys.argv[1])
+    memory_limit: Final = int(sys.argv[2]) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    if fd == 0:
+        fp: BinaryIO = BytesIO(sys.stdin.buffer.read())
+    else:
+        # mmapはpdfminerが使うread/seek/tellを備えている
+        fp = cast(BinaryIO, mmap.mmap(fd, 0, access=mmap.ACCESS_READ))
+    with fp:
+        for page in iter_pages(fp):
+            _write_frame(sys.stdout.buffer, page)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncGenerator, BinaryIO, Final, final
+
+from adapter.adapter import (
+    ChatMessage,
+    MetricsAdapter,
+    OpenAIAdapter,
+    RateLimiterAdapter,
+)
+from domain.assistant import Assistant, AssistantId, ThreadId, VectorStoreId
+from domain.chunk import estimate_tokens
+from domain.document import DocumentId
+from domain.rate_limit import TokenBucket
+from infra.openai import CHAT_COMPLETION_MAX_TOKENS
+
+
+@final
+class InMemoryRateLimiterImpl:
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        metrics: MetricsAdapter,
+    ) -> None:
+        now: Final = time.monotonic()
+        self.requests: Final = TokenBucket.per_minute(requests_per_minute, now)
+        self.tokens: Final = TokenBucket.per_minute(tokens_per_minute, now)
+        self.metrics: Final = metrics
+
+    @classmethod
+    def new(
+        cls,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        metrics: MetricsAdapter,
+    ) -> RateLimiterAdapter:
+        return cls(requests_per_minute, tokens_per_minute, metrics)
+
+    async def acquire(self, requests: int, tokens: int) -> None:
+        now: Final = time.monotonic()
+        wait: Final = max(
+            self.requests.reserve(requests, now), self.tokens.reserve(tokens, now)
+        )
+        self.metrics.observe("openai_rate_limit_wait_seconds", wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# OpenAIAdapterの前段でRPMとTPMの予算を確保してから呼び出す
+# トークン数は送信するテキストからの概算に、応答の上限を足したもの
+@final
+class RateLimitedOpenAIImpl:
+    def __init__(
+        self,
+        inner: OpenAIAdapter,
+        limiter: RateLimiterAdapter,
+        assistant_tokens: int,
+    ) -> None:
+        self.inner: Final = inner
+        self.limiter: Final = limiter
+        self.assistant_tokens: Final = assistant_tokens
+
+    @classmethod
+    def new(
+        cls,
+        inner: OpenAIAdapter,
+        limiter: RateLimiterAdapter,
+        assistant_tokens: int,
+    ) -> OpenAIAdapter:
+        return cls(inner, limiter, assistant_tokens)
+
+    async def chat_assistant(self, _assistant: Assistant, message: str) -> str:
+        await self.limiter.acquire(
+            1, estimate_tokens(message) + self.assistant_tokens
+        )
+        return await self.inner.chat_assistant(_assistant, message)
+
+    async def stream_chat_assistant(
+        self, _assistant: Assistant, message: str
+    ) -> AsyncGenerator[str, None]:
+        await self.limiter.acquire(
+            1, estimate_tokens(message) + self.assistant_tokens
+        )
+        async with aclosing(
+            self.inner.stream_chat_assistant(_assistant, message)
+        ) as stream:
+            async for text in stream:
+                yield text
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        await self.limiter.acquire(1, 0)
+        return await self.inner.create_vector_store(document)
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        await self.limiter.acquire(1, 0)
+        await self.inner.delete_vector_store(vector_store_id)
+
+    async def create_assistant(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        await self.limiter.acquire(1, 0)
+        return await self.inner.create_assistant(document_id, vector_store_id)
+
+    async def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        await self.limiter.acquire(2, 0)
+        return await self.inner.create_pooled_assistant()
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        await self.limiter.acquire(1, 0)
+        await self.inner.attach_assistant(assistant_id, document_id, vector_store_id)
+
+    async def delete_assistant(self, assistant_id: AssistantId) -> None:
+        await self.limiter.acquire(1, 0)
+        await self.inner.delete_assistant(assistant_id)
+
+    async def chat_completion(self, messages: list[ChatMessage]) -> str:
+        prompt_tokens: Final = sum(estimate_tokens(m.content) for m in messages)
+        await self.limiter.acquire(1, prompt_tokens + CHAT_COMPLETION_MAX_TOKENS)
+        return await self.inner.chat_completion(messages)
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        await self.limiter.acquire(1, sum(estimate_tokens(t) for t in texts))
+        return await self.inner.create_embeddings(texts)
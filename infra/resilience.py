@@ -0,0 +1,325 @@
+import asyncio
+import random
+import time
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Final,
+    final,
+    Iterator,
+    Optional,
+)
+
+import openai
+import requests
+from google.api_core.exceptions import ServerError, TooManyRequests
+from google.api_core.retry import if_transient_error
+
+from adapter.adapter import (
+    ChatMessage,
+    MetricsAdapter,
+    OpenAIAdapter,
+    StorageAdapter,
+    TaskQueueAdapter,
+)
+from config.envs import DEFAULT_BUCKET_NAME
+from domain.assistant import Assistant, AssistantId, ThreadId, VectorStoreId
+from domain.document import DocumentId
+from domain.error import AppError, ErrorKind
+from domain.resilience import CircuitBreaker, backoff_delay
+from domain.usage import retrying
+
+
+def _causes(e: BaseException) -> Iterator[BaseException]:
+    cause: Optional[BaseException] = e
+    while cause is not None:
+        yield cause
+        cause = cause.__cause__
+
+
+# 各アダプタは例外をAppErrorで包むことがあるため、原因を辿って判定する
+def is_transient_openai_error(e: BaseException) -> bool:
+    return any(
+        isinstance(
+            c,
+            (
+                openai.APIConnectionError,
+                openai.RateLimitError,
+                openai.InternalServerError,
+            ),
+        )
+        for c in _causes(e)
+    )
+
+
+def is_transient_google_error(e: BaseException) -> bool:
+    return any(
+        isinstance(c, (ServerError, requests.Timeout))
+        or (isinstance(c, Exception) and if_transient_error(c))
+        for c in _causes(e)
+    )
+
+
+# タスクの作成は繰り返すと重複するため、リクエストが受け付けられていないことが確実なエラー(429)のみを対象にする
+def is_rejected_google_error(e: BaseException) -> bool:
+    return any(isinstance(c, TooManyRequests) for c in _causes(e))
+
+
+# 依存先ごとのリトライとサーキットブレーカー
+# 一時的なエラーのみを失敗として数え、それ以外のエラー(404など)は依存先が動いている証拠として扱う
+@final
+class Resilience:
+    def __init__(
+        self,
+        name: str,
+        is_transient: Callable[[BaseException], bool],
+        max_attempts: int,
+        base_delay_seconds: float,
+        max_delay_seconds: float,
+        failure_threshold: int,
+        reset_seconds: float,
+        metrics: MetricsAdapter,
+    ) -> None:
+        self.name: Final = name
+        self.is_transient: Final = is_transient
+        self.max_attempts: Final = max_attempts
+        self.base_delay_seconds: Final = base_delay_seconds
+        self.max_delay_seconds: Final = max_delay_seconds
+        self.metrics: Final = metrics
+        self.__breaker: Final = CircuitBreaker(failure_threshold, reset_seconds)
+
+    # この呼び出しが半開状態の試行になった場合は、abandonに渡すための開始時刻を返す
+    def check(self) -> Optional[float]:
+        now: Final = time.monotonic()
+        if not self.__breaker.allow(now):
+            self.metrics.incr("circuit_rejected", labels={"dependency": self.name})
+            raise AppError(
+                ErrorKind.INTERNAL, f"{self.name}が一時的に利用できません"
+            )
+        return now if self.__breaker.is_trial(now) else None
+
+    def record(self, e: Optional[BaseException]) -> None:
+        if e is None or not self.is_transient(e):
+            self.__breaker.record_success()
+        elif self.__breaker.record_failure(time.monotonic()):
+            self.metrics.incr("circuit_open", labels={"dependency": self.name})
+
+    # キャンセルなどで結果が分からないまま終わった呼び出しは、成功とも失敗とも数えない
+    # 試行だった場合だけ、次の試行を許す
+    def abandon(self, trial: Optional[float]) -> None:
+        if trial is not None:
+            self.__breaker.abandon_trial(trial)
+
+    # retry_ifを指定した場合は、一時的なエラーのうちそれを満たすものだけをリトライする
+    async def call[T](
+        self,
+        fn: Callable[[], Awaitable[T]],
+        retry: bool = True,
+        retry_if: Optional[Callable[[BaseException], bool]] = None,
+    ) -> T:
+        attempt = 0
+        while True:
+            trial = self.check()
+            try:
+                with retrying(attempt):
+                    result = await fn()
+            except Exception as e:
+                self.record(e)
+                attempt += 1
+                if (
+                    not retry
+                    or attempt >= self.max_attempts
+                    or not self.is_transient(e)
+                    or (retry_if is not None and not retry_if(e))
+                ):
+                    raise
+                self.metrics.incr("resilience_retry", labels={"dependency": self.name})
+                await asyncio.sleep(
+                    backoff_delay(
+                        attempt - 1,
+                        self.base_delay_seconds,
+                        self.max_delay_seconds,
+                        random.random(),
+                    )
+                )
+                continue
+            except BaseException:
+                self.abandon(trial)
+                raise
+            self.record(None)
+            return result
+
+
+# メッセージの追加や実行の開始は繰り返すと重複するため、アシスタントやベクトルストアの作成と会話はリトライしない
+@final
+class ResilientOpenAIImpl:
+    def __init__(self, inner: OpenAIAdapter, resilience: Resilience) -> None:
+        self.inner: Final = inner
+        self.resilience: Final = resilience
+
+    @classmethod
+    def new(cls, inner: OpenAIAdapter, resilience: Resilience) -> OpenAIAdapter:
+        return cls(inner, resilience)
+
+    async def chat_assistant(self, _assistant: Assistant, message: str) -> str:
+        return await self.resilience.call(
+            lambda: self.inner.chat_assistant(_assistant, message), retry=False
+        )
+
+    async def stream_chat_assistant(
+        self, _assistant: Assistant, message: str
+    ) -> AsyncGenerator[str, None]:
+        trial: Final = self.resilience.check()
+        try:
+            async with aclosing(
+                self.inner.stream_chat_assistant(_assistant, message)
+            ) as stream:
+                async for text in stream:
+                    yield text
+        except Exception as e:
+            self.resilience.record(e)
+            raise
+        except BaseException:
+            self.resilience.abandon(trial)
+            raise
+        self.resilience.record(None)
+
+    async def create_vector_store(self, document: BinaryIO) -> VectorStoreId:
+        return await self.resilience.call(
+            lambda: self.inner.create_vector_store(document), retry=False
+        )
+
+    async def delete_vector_store(self, vector_store_id: VectorStoreId) -> None:
+        await self.resilience.call(
+            lambda: self.inner.delete_vector_store(vector_store_id)
+        )
+
+    async def create_assistant(
+        self, document_id: DocumentId, vector_store_id: VectorStoreId
+    ) -> tuple[AssistantId, ThreadId]:
+        return await self.resilience.call(
+            lambda: self.inner.create_assistant(document_id, vector_store_id),
+            retry=False,
+        )
+
+    async def create_pooled_assistant(self) -> tuple[AssistantId, ThreadId]:
+        return await self.resilience.call(
+            lambda: self.inner.create_pooled_assistant(), retry=False
+        )
+
+    async def attach_assistant(
+        self,
+        assistant_id: AssistantId,
+        document_id: DocumentId,
+        vector_store_id: VectorStoreId,
+    ) -> None:
+        await self.resilience.call(
+            lambda: self.inner.attach_assistant(
+                assistant_id, document_id, vector_store_id
+            )
+        )
+
+    async def delete_assistant(self, assistant_id: AssistantId) -> None:
+        await self.resilience.call(lambda: self.inner.delete_assistant(assistant_id))
+
+    async def chat_completion(self, messages: list[ChatMessage]) -> str:
+        return await self.resilience.call(lambda: self.inner.chat_completion(messages))
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await self.resilience.call(lambda: self.inner.create_embeddings(texts))
+
+
+@final
+class ResilientStorageImpl:
+    def __init__(self, inner: StorageAdapter, resilience: Resilience) -> None:
+        self.inner: Final = inner
+        self.resilience: Final = resilience
+
+    @classmethod
+    def new(cls, inner: StorageAdapter, resilience: Resilience) -> StorageAdapter:
+        return cls(inner, resilience)
+
+    async def download_object(
+        self,
+        key: str,
+        destination_file_name: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+    ) -> None:
+        await self.resilience.call(
+            lambda: self.inner.download_object(key, destination_file_name, bucket_name)
+        )
+
+    async def upload_object(
+        self,
+        key: str,
+        source_file_name: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+    ) -> None:
+        await self.resilience.call(
+            lambda: self.inner.upload_object(key, source_file_name, bucket_name)
+        )
+
+    async def gen_pre_signed_upload_url(
+        self,
+        key: str,
+        content_type: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+        expiration_minutes: int = 15,
+    ) -> str:
+        return await self.resilience.call(
+            lambda: self.inner.gen_pre_signed_upload_url(
+                key, content_type, bucket_name, expiration_minutes
+            )
+        )
+
+    async def gen_pre_signed_get_url(
+        self,
+        key: str,
+        bucket_name: str = DEFAULT_BUCKET_NAME,
+        expiration_minutes: int = 15,
+    ) -> str:
+        return await self.resilience.call(
+            lambda: self.inner.gen_pre_signed_get_url(
+                key, bucket_name, expiration_minutes
+            )
+        )
+
+    async def delete_object(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> None:
+        await self.resilience.call(lambda: self.inner.delete_object(key, bucket_name))
+
+    async def get_generation(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> int:
+        return await self.resilience.call(
+            lambda: self.inner.get_generation(key, bucket_name)
+        )
+
+    async def open_object(
+        self, key: str, bucket_name: str = DEFAULT_BUCKET_NAME
+    ) -> BinaryIO:
+        return await self.resilience.call(
+            lambda: self.inner.open_object(key, bucket_name)
+        )
+
+
+@final
+class ResilientTaskQueueImpl:
+    def __init__(self, inner: TaskQueueAdapter, resilience: Resilience) -> None:
+        self.inner: Final = inner
+        self.resilience: Final = resilience
+
+    @classmethod
+    def new(cls, inner: TaskQueueAdapter, resilience: Resilience) -> TaskQueueAdapter:
+        return cls(inner, resilience)
+
+    async def send_queue(self, name: str, path: str, payload: dict[str, Any]) -> None:
+        await self.resilience.call(
+            lambda: self.inner.send_queue(name, path, payload),
+            retry_if=is_rejected_google_error,
+        )
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncGenerator, BinaryIO, Final, cast
+
+from adapter.adapter import ChatMessage, OpenAIAdapter, StorageAdapter
+from domain.assistant import Assistant, AssistantId, ThreadId, VectorStoreId
+from domain.document import DocumentId
+from infra.local_retrieval import LocalRetrievalOpenAIImpl
+from infra.metrics import InMemoryMetricsImpl
+
+_WORDS: Final = ("apple", "banana", "cherry")
+_PAGES: Final = [f"{word} " * 30 for word in _WORDS]
+
+
+# 含まれる単語の数をそのまま埋め込みにする
+class _Inner:
+    def __init__(self) -> None:
+        self.messages: list[ChatMessage] = []
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return [[float(text.count(word)) for word in _WORDS] for text in texts]
+
+    async def chat_completion(self, messages: list[ChatMessage]) -> str:
+        self.messages = messages
+        return "answer"
+
+
+class _Pdf:
+    async def extract_pages(self, document: BinaryIO) -> AsyncGenerator[str, None]:
+        for page in _PAGES:
+            yield page
+
+
+class _Storage:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+
+    async def upload_object(
+        self, key: str, source_file_name: str, bucket_name: str = ""
+    ) -> None:
+        self.objects[key] = Path(source_file_name).read_bytes()
+
+    async def download_object(
+        self, key: str, destination_file_name: str, bucket_name: str = ""
+    ) -> None:
+        Path(destination_file_name).write_bytes(self.objects[key])
+
+    async def delete_object(self, key: str, bucket_name: str = "") -> None:
+        self.objects.pop(key, None)
+
+
+def _new(
+    inner: _Inner, storage: _Storage, index_dir: Path, index_cache_size: int = 64
+) -> OpenAIAdapter:
+    return LocalRetrievalOpenAIImpl.new(
+        # 使うメソッドだけを実装した偽物を渡す
+        inner=cast(OpenAIAdapter, inner),
+        pdf=_Pdf(),
+        storage=cast(StorageAdapter, storage),
+        metrics=InMemoryMetricsImpl.new(),
+        index_dir=str(index_dir),
+        chunk_tokens=20,
+        chunk_overlap_tokens=0,
+        top_k=1,
+        index_cache_size=index_cache_size,
+    )
+
+
+def _assistant(vector_store_id: VectorStoreId) -> Assistant:
+    return Assistant.new(
+        AssistantId("assistant"),
+        DocumentId("document"),
+        ThreadId("thread"),
+        datetime.now(timezone.utc),
+        vector_store_id,
+    )
+
+
+def test_local_retrieval(tmp_path: Path) -> None:
+    inner = _Inner()
+    storage = _Storage()
+
+    async def run() -> None:
+        openai = _new(inner, storage, tmp_path / "a")
+        vector_store_id = await openai.create_vector_store(io.BytesIO(b"%PDF"))
+        answer = await openai.chat_assistant(_assistant(vector_store_id), "banana?")
+        assert answer == "answer"
+
+        # 質問に近いチャンクだけを渡す
+        system = inner.messages[0].content
+        assert "banana" in system
+        assert "apple" not in system and "cherry" not in system
+        assert inner.messages[1] == ChatMessage(role="user", content="banana?")
+
+        # 別のインスタンスではCloud Storageから取得して回答する
+        other = _new(inner, storage, tmp_path / "b")
+        await other.chat_assistant(_assistant(vector_store_id), "cherry?")
+        assert "cherry" in inner.messages[0].content
+        assert os.listdir(tmp_path / "b") == [vector_store_id]
+
+    asyncio.run(run())
+
+
+def test_local_retrieval_evicts_files(tmp_path: Path) -> None:
+    inner = _Inner()
+    storage = _Storage()
+
+    async def run() -> None:
+        openai = _new(inner, storage, tmp_path, index_cache_size=1)
+        first = await openai.create_vector_store(io.BytesIO(b"%PDF"))
+        second = await openai.create_vector_store(io.BytesIO(b"%PDF"))
+        assert os.listdir(tmp_path) == [second]
+
+        # 追い出されたインデックスは取得し直して使う
+        await openai.chat_assistant(_assistant(first), "apple?")
+        assert "apple" in inner.messages[0].content
+        assert os.listdir(tmp_path) == [first]
+
+        await openai.delete_vector_store(first)
+        assert os.listdir(tmp_path) == []
+        assert all(second in key for key in storage.objects)
+
+    asyncio.run(run())
+
+
+def test_local_retrieval_removes_stale_files(tmp_path: Path) -> None:
+    stale = tmp_path / "local-stale"
+    stale.mkdir()
+    (stale / "chunks.json").write_text("[]")
+
+    _new(_Inner(), _Storage(), tmp_path)
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from typing import BinaryIO, Final, final
+
+from adapter.adapter import (
+    MetricsAdapter,
+    OpenAIAdapter,
+    VectorStoreAdapter,
+    VectorStoreRepository,
+)
+from domain.assistant import VectorStore, VectorStoreId
+
+
+def _file_hash(document: BinaryIO) -> str:
+    digest: Final = hashlib.sha256()
+    document.seek(0)
+    for chunk in iter(lambda: document.read(1024 * 1024), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 同じ内容のPDFはアップロードとインデックス作成を省き、既存のベクトルストアを参照数付きで共有する
+# 参照が無くなったベクトルストアだけをOpenAIから削除する
+@final
+class SharedVectorStoreImpl:
+    def __init__(
+        self,
+        openai: OpenAIAdapter,
+        repository: VectorStoreRepository,
+        metrics: MetricsAdapter,
+    ) -> None:
+        self.openai: Final = openai
+        self.repository: Final = repository
+        self.metrics: Final = metrics
+
+    @classmethod
+    def new(
+        cls,
+        openai: OpenAIAdapter,
+        repository: VectorStoreRepository,
+        metrics: MetricsAdapter,
+    ) -> VectorStoreAdapter:
+        return cls(openai, repository, metrics)
+
+    async def acquire(self, document: BinaryIO) -> VectorStoreId:
+        content_hash: Final = await asyncio.to_thread(_file_hash, document)
+        while True:
+            shared = await self.repository.acquire(content_hash)
+            if shared is not None:
+                self.metrics.incr("vector_store_reused")
+                return shared
+
+            created = await self.openai.create_vector_store(document)
+            inserted = await self.repository.insert(
+                VectorStore.new(created, content_hash, datetime.now(timezone.utc))
+            )
+            if inserted:
+                self.metrics.incr("vector_store_created")
+                return created
+
+            # 同じ内容を同時に登録された場合は作ったものを捨てて、先に登録された方を参照する
+            await self.openai.delete_vector_store(created)
+
+    async def release(self, vector_store_id: VectorStoreId) -> None:
+        if await self.repository.release(vector_store_id):
+            await self.openai.delete_vector_store(vector_store_id)
@@ -56,4 +56,24 @@ resource "google_cloud_tasks_queue" "summarise_document" {
   depends_on = [
     google_project_service.cloud_tasks
   ]
-}
\ No newline at end of file
+}
+resource "google_cloud_tasks_queue" "refill_assistant_pool" {
+  name     = "refill-assistant-pool"
+  location = var.region
+
+  # 補充が同時に走ってプールのサイズを超えないよう1件ずつ処理する
+  rate_limits {
+    max_dispatches_per_second = 1
+    max_concurrent_dispatches = 1
+  }
+
+  retry_config {
+    max_attempts = 1
+    min_backoff  = "0.1s"
+    max_backoff  = "3600s"
+  }
+
+  depends_on = [
+    google_project_service.cloud_tasks
+  ]
+}